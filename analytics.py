@@ -1,353 +1,479 @@
 import sqlite3
+import numpy as np
 import pandas as pd
 
+from ingest import backfill_hand_combos, ensure_hand_columns, read_ingest_version
+
+def _vectorized_map_pos(rank, n):
+    # Map pos_rank / num_players arrays to SB, BB, UTG, etc.
+    rank = np.asarray(rank, dtype=float)
+    n = np.asarray(n, dtype=float)
+    unknown = np.isnan(rank) | np.isnan(n)
+    heads_up = n == 2
+
+    fallback = np.char.add('Pos ', np.where(unknown, 0, rank).astype(int).astype(str))
+    conditions = [
+        unknown,
+        heads_up & (rank == 1),
+        heads_up & (rank == 2),
+        heads_up,
+        rank == 1,
+        rank == 2,
+        rank == n,
+        rank == n - 1,
+        rank == n - 2,
+        rank == 3,
+        (rank == 4) & (n >= 8),
+        rank == 4,
+        (rank == 5) & (n >= 9),
+        rank == 5,
+        rank == 6,
+    ]
+    choices = ['Unknown', 'BTN/SB', 'BB', fallback, 'SB', 'BB', 'BTN', 'CO', 'HJ',
+               'UTG', 'UTG+1', 'MP', 'MP', 'MP+1', 'MP+1']
+    return np.select(conditions, choices, default=fallback).astype(object)
+
+# Display order of the position labels; anything else (the 'Pos N' fallback) sorts last
+POS_ORDER_IDX = {p: i for i, p in enumerate(['BTN/SB', 'SB', 'BB', 'UTG', 'UTG+1', 'MP', 'MP+1', 'HJ', 'CO', 'BTN', 'Unknown'])}
+
+def _sort_by_position(result):
+    order = result['position'].map(POS_ORDER_IDX).fillna(len(POS_ORDER_IDX))
+    return result.iloc[order.argsort(kind='stable')]
+
+# Showdown description keywords, strongest first
+HAND_STRENGTHS = [
+    (('royal flush', 'straight flush'), 8),
+    (('four of a kind', 'quads'), 7),
+    (('full house',), 6),
+    (('flush',), 5),
+    (('straight',), 4),
+    (('three of a kind', 'set', 'trips'), 3),
+    (('two pair',), 2),
+    (('pair',), 1),
+]
+
+# Covering indexes for the hot (stage, action) filters and per-hand ordering. Each one shows up
+# in the plan of at least one query below; the money views read hand_facts instead.
+EVENT_INDEXES = """
+-- Preflop/river filters in the hand_facts build, _saw_flop and the showdown strength query
+CREATE INDEX IF NOT EXISTS idx_events_stage_action ON events(stage, action, player_id, hand_id);
+-- Action-only lookups: deal_flop, fold, collect and show
+CREATE INDEX IF NOT EXISTS idx_events_action ON events(action, hand_id, player_id);
+-- Per-hand ordering for the seat ranks in the hand_facts build
+CREATE INDEX IF NOT EXISTS idx_events_hand_id_id ON events(hand_id, id);
+-- Per-player (stage, action) scans: _base_players, the river sets and bet sizing
+CREATE INDEX IF NOT EXISTS idx_events_player_stage_action ON events(player_id, stage, action, hand_id, amount);
+-- Superseded by idx_events_player_stage_action; dropped from databases that still have it
+DROP INDEX IF EXISTS idx_events_player_action;
+"""
+
+PLAYER_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_players_player_name ON players(player_id, player_name);
+"""
+
+# Small is < 33% of the pot, Medium is 33-66% inclusive, Large is anything above
+BET_SIZE_LABELS = ['Small (<33%)', 'Medium (33-66%)', 'Large (>66%)']
+
+# Read-heavy tuning: WAL, 256MB page cache, mmap'd reads and in-memory temp b-trees for the CTEs.
+# journal_mode=WAL is persistent: the database file stays in WAL mode for every later connection
+# (ingest included) and keeps -wal/-shm files next to it; with synchronous=NORMAL a power loss
+# can drop the last commits, but never corrupts the file.
+CONNECTION_PRAGMAS = """
+PRAGMA journal_mode=WAL;
+PRAGMA synchronous=NORMAL;
+PRAGMA cache_size=-262144;
+PRAGMA mmap_size=1073741824;
+PRAGMA temp_store=MEMORY;
+PRAGMA threads=4;
+"""
+
+DISPLAY_NAMES_DDL = """
+DROP TABLE IF EXISTS temp._display_names_version;
+DROP TABLE IF EXISTS temp.player_display_names;
+
+CREATE TEMP TABLE _display_names_version (ingest_version INTEGER);
+
+CREATE TEMP TABLE player_display_names (
+    player_id TEXT PRIMARY KEY,
+    display_name TEXT
+);
+INSERT INTO player_display_names (player_id, display_name)
+SELECT player_id, player_name
+FROM (
+    SELECT player_id, player_name,
+           ROW_NUMBER() OVER(PARTITION BY player_id ORDER BY COUNT(*) DESC) as rn
+    FROM players
+    GROUP BY player_id, player_name
+)
+WHERE rn = 1;
+"""
+
+# (player_id, hand_id) sets behind the post-flop stats, kept as indexed temp tables
+HAND_SETS_DDL = """
+DROP TABLE IF EXISTS temp._hand_sets_version;
+DROP TABLE IF EXISTS temp._base_players;
+DROP TABLE IF EXISTS temp._saw_flop;
+DROP TABLE IF EXISTS temp._showdowns;
+DROP TABLE IF EXISTS temp._wins;
+DROP TABLE IF EXISTS temp._river_bluffs;
+DROP TABLE IF EXISTS temp._river_raise_opps;
+
+CREATE TEMP TABLE _hand_sets_version (ingest_version INTEGER);
+
+CREATE TEMP TABLE _base_players AS
+SELECT DISTINCT player_id, hand_id
+FROM events
+WHERE player_id != 'Dealer' AND action NOT IN ('deal_flop', 'deal_turn', 'deal_river');
+CREATE INDEX temp._base_players_idx ON _base_players(player_id, hand_id);
+
+CREATE TEMP TABLE _saw_flop AS
+WITH flops AS (
+    -- Newer hands record their board; older ones have a 'Dealer' deal_flop event instead
+    SELECT hand_id FROM hands WHERE board_stage IS NOT NULL
+    UNION
+    SELECT hand_id FROM events WHERE action = 'deal_flop'
+),
+preflop_folds AS (
+    SELECT DISTINCT player_id, hand_id FROM events WHERE stage = 'Preflop' AND action = 'fold'
+)
+SELECT bp.player_id, bp.hand_id
+FROM _base_players bp
+JOIN flops f ON bp.hand_id = f.hand_id
+LEFT JOIN preflop_folds pf ON bp.hand_id = pf.hand_id AND bp.player_id = pf.player_id
+WHERE pf.player_id IS NULL;
+CREATE INDEX temp._saw_flop_idx ON _saw_flop(player_id, hand_id);
+
+CREATE TEMP TABLE _showdowns AS
+WITH folds AS (
+    SELECT DISTINCT player_id, hand_id FROM events WHERE action = 'fold'
+),
+survivors AS (
+    SELECT bp.player_id, bp.hand_id
+    FROM _base_players bp
+    LEFT JOIN folds f ON bp.player_id = f.player_id AND bp.hand_id = f.hand_id
+    WHERE f.player_id IS NULL
+),
+showdown_hands AS (
+    SELECT hand_id FROM survivors GROUP BY hand_id HAVING COUNT(player_id) > 1
+)
+SELECT s.player_id, s.hand_id
+FROM survivors s
+JOIN showdown_hands sh ON s.hand_id = sh.hand_id;
+CREATE INDEX temp._showdowns_idx ON _showdowns(player_id, hand_id);
+
+CREATE TEMP TABLE _wins AS
+SELECT DISTINCT player_id, hand_id FROM events WHERE action = 'collect';
+CREATE INDEX temp._wins_idx ON _wins(player_id, hand_id);
+
+CREATE TEMP TABLE _river_bluffs AS
+WITH river_raises AS (
+    SELECT DISTINCT player_id, hand_id FROM events WHERE stage = 'River' AND action IN ('raise', 'bet', 'raise_to_amount')
+)
+SELECT rr.player_id, rr.hand_id
+FROM river_raises rr
+JOIN _showdowns s ON rr.hand_id = s.hand_id AND rr.player_id = s.player_id
+LEFT JOIN _wins w ON rr.hand_id = w.hand_id AND rr.player_id = w.player_id
+WHERE w.player_id IS NULL;
+CREATE INDEX temp._river_bluffs_idx ON _river_bluffs(player_id, hand_id);
+
+CREATE TEMP TABLE _river_raise_opps AS
+WITH river_raises AS (
+    SELECT DISTINCT player_id, hand_id FROM events WHERE stage = 'River' AND action IN ('raise', 'bet', 'raise_to_amount')
+)
+SELECT rr.player_id, rr.hand_id
+FROM river_raises rr
+JOIN _showdowns s ON rr.hand_id = s.hand_id AND rr.player_id = s.player_id;
+CREATE INDEX temp._river_raise_opps_idx ON _river_raise_opps(player_id, hand_id);
+"""
+
+HAND_FACTS_DDL = """
+CREATE TABLE IF NOT EXISTS hand_facts (
+    hand_id TEXT,
+    player_id TEXT,
+    invested REAL,      -- NULL when the player put nothing in
+    returned REAL,
+    collected REAL,
+    pos_rank INTEGER,   -- NULL when the player took no preflop action
+    num_players INTEGER,
+    vpip_flag INTEGER,
+    pfr_flag INTEGER,
+    three_bet_flag INTEGER,
+    PRIMARY KEY (hand_id, player_id)
+);
+CREATE INDEX IF NOT EXISTS hand_facts_pid ON hand_facts(player_id);
+-- ingest_version the table was built from
+CREATE TABLE IF NOT EXISTS hand_facts_version (
+    ingest_version INTEGER
+);
+"""
+
+HAND_FACTS_QUERY = """
+INSERT INTO hand_facts
+(hand_id, player_id, invested, returned, collected, pos_rank, num_players, vpip_flag, pfr_flag, three_bet_flag)
+WITH hand_scales AS (
+    -- Integer cents for newer hands; NULL units mean the amounts were stored in dollars
+    SELECT hand_id, CASE WHEN units = 'cents' THEN 100.0 ELSE 1.0 END as scale
+    FROM hands
+),
+street_money AS (
+    SELECT hand_id, player_id,
+           MAX(CASE WHEN action IN ('post_sb', 'post_bb', 'post_other', 'call', 'raise', 'bet', 'raise_to_amount') THEN amount END) as street_max,
+           SUM(CASE WHEN action = 'returned' THEN amount ELSE 0 END) as returned,
+           SUM(CASE WHEN action = 'collect' THEN amount ELSE 0 END) as collected,
+           -- VPIP: Voluntarily put money in pot. Calls or raises preflop.
+           MAX(CASE WHEN stage = 'Preflop' AND action IN ('call', 'raise', 'raise_to_amount') THEN 1 ELSE 0 END) as vpip_flag,
+           -- PFR: Preflop raise
+           MAX(CASE WHEN stage = 'Preflop' AND action LIKE 'raise%' THEN 1 ELSE 0 END) as pfr_flag
+    FROM events
+    GROUP BY hand_id, player_id, stage
+),
+money AS (
+    -- Amounts are summed in the hand's units and converted to dollars once per (hand, player)
+    SELECT sm.hand_id, sm.player_id,
+           SUM(street_max) / COALESCE(u.scale, 1.0) as invested,
+           SUM(returned) / COALESCE(u.scale, 1.0) as returned,
+           SUM(collected) / COALESCE(u.scale, 1.0) as collected,
+           MAX(vpip_flag) as vpip_flag,
+           MAX(pfr_flag) as pfr_flag
+    FROM street_money sm
+    LEFT JOIN hand_scales u ON sm.hand_id = u.hand_id
+    GROUP BY sm.hand_id, sm.player_id
+),
+positions AS (
+    SELECT hand_id, player_id,
+           RANK() OVER(PARTITION BY hand_id ORDER BY MIN(id) ASC) as pos_rank
+    FROM events
+    WHERE stage = 'Preflop' AND (action LIKE 'post_%' OR action IN ('fold','call','raise','check'))
+    GROUP BY hand_id, player_id
+),
+hand_counts AS (
+    -- positions already has one row per (hand, player)
+    SELECT hand_id, COUNT(player_id) as num_players
+    FROM positions
+    GROUP BY hand_id
+),
+preflop_raises AS (
+    SELECT hand_id, player_id,
+           ROW_NUMBER() OVER(PARTITION BY hand_id ORDER BY id) as raise_seq
+    FROM events
+    WHERE stage = 'Preflop' AND action LIKE 'raise%'
+),
+three_bets AS (
+    -- 3-Bet: Raise preflop when there is already a raise (simplified heuristic: more than 1 raise in the hand preflop, or raising a raise)
+    -- A true 3-bet calculation requires knowing the state of previous actions.
+    -- For MVP: We will count a 3-bet if a player raises and there was already a raise in the same hand preflop.
+    SELECT DISTINCT hand_id, player_id
+    FROM preflop_raises
+    WHERE raise_seq > 1
+)
+SELECT
+    m.hand_id,
+    m.player_id,
+    m.invested,
+    m.returned,
+    m.collected,
+    pos.pos_rank,
+    hc.num_players,
+    m.vpip_flag,
+    m.pfr_flag,
+    CASE WHEN tb.player_id IS NULL THEN 0 ELSE 1 END
+FROM money m
+LEFT JOIN positions pos ON m.hand_id = pos.hand_id AND m.player_id = pos.player_id
+LEFT JOIN hand_counts hc ON m.hand_id = hc.hand_id
+LEFT JOIN three_bets tb ON m.hand_id = tb.hand_id AND m.player_id = tb.player_id
+"""
+
 class PokerAnalytics:
     def __init__(self, db_path='pokernow.db'):
-        self.conn = sqlite3.connect(db_path, check_same_thread=False)
-
-    def get_priors(self):
-        query = """
-        WITH top_names AS (
-            SELECT player_id, player_name,
-                   ROW_NUMBER() OVER(PARTITION BY player_id ORDER BY COUNT(*) DESC) as rn
-            FROM players
-            GROUP BY player_id, player_name
-        ),
-        player_hands AS (
-            SELECT player_id, COUNT(DISTINCT hand_id) as total_hands
-            FROM events
-            GROUP BY player_id
-        ),
-        vpip_hands AS (
-            -- VPIP: Voluntarily put money in pot. Calls or raises preflop.
-            SELECT player_id, COUNT(DISTINCT hand_id) as vpip_hands
-            FROM events
-            WHERE stage = 'Preflop' AND action IN ('call', 'raise', 'raise_to_amount')
-              AND NOT action IN ('post_sb', 'post_bb')
-            GROUP BY player_id
-        ),
-        pfr_hands AS (
-            -- PFR: Preflop raise
-            SELECT player_id, COUNT(DISTINCT hand_id) as pfr_hands
-            FROM events
-            WHERE stage = 'Preflop' AND action LIKE 'raise%'
-            GROUP BY player_id
-        ),
-        three_bet_hands AS (
-            -- 3-Bet: Raise preflop when there is already a raise (simplified heuristic: more than 1 raise in the hand preflop, or raising a raise)
-            -- A true 3-bet calculation requires knowing the state of previous actions.
-            -- For MVP: We will count a 3-bet if a player raises and there was already a raise in the same hand preflop.
-            SELECT e1.player_id, COUNT(DISTINCT e1.hand_id) as three_bet_hands
-            FROM events e1
-            JOIN events e2 ON e1.hand_id = e2.hand_id
-              AND e2.stage = 'Preflop' AND e2.action LIKE 'raise%'
-              AND e1.id > e2.id
-            WHERE e1.stage = 'Preflop' AND e1.action LIKE 'raise%'
-            GROUP BY e1.player_id
-        )
+        # sqlite3 keeps an LRU of compiled statements keyed by SQL text
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, cached_statements=64)
+        self.conn.executescript(CONNECTION_PRAGMAS)
+        self._ensure_indexes()
+
+    def _table_exists(self, name):
+        row = self.conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)).fetchone()
+        return row is not None
+
+    def _ensure_indexes(self):
+        # Nothing to index until ingest has created the schema
+        if not self._table_exists('events'):
+            return
+        self.conn.executescript(EVENT_INDEXES)
+        self.conn.executescript(HAND_FACTS_DDL)
+        # Databases from older ingests lack the newer hands columns the queries read
+        if self._table_exists('hands'):
+            ensure_hand_columns(self.conn)
+        if self._table_exists('players'):
+            self.conn.executescript(PLAYER_INDEXES)
+        if self._table_exists('sqlite_stat1'):
+            self.conn.execute('PRAGMA optimize')
+        else:
+            self.conn.execute('ANALYZE')
+
+    def _ensure_display_names(self):
+        # Most common name per player, rebuilt per connection whenever a load has bumped ingest_version
+        version = read_ingest_version(self.conn)
+        if self.conn.execute("SELECT 1 FROM sqlite_temp_master WHERE name = '_display_names_version'").fetchone():
+            if self.conn.execute('SELECT ingest_version FROM _display_names_version').fetchone() == (version,):
+                return
+        self.conn.executescript(DISPLAY_NAMES_DDL)
+        with self.conn:
+            self.conn.execute('INSERT INTO _display_names_version (ingest_version) VALUES (?)', (version,))
+
+    def get_ingest_version(self):
+        # Changes only when a load finishes, so callers can key cached results on it
+        return read_ingest_version(self.conn)
+
+    def _ensure_hand_sets(self):
+        # Rebuild the post-flop hand sets only when a load has bumped ingest_version since the last build
+        version = read_ingest_version(self.conn)
+        if self.conn.execute("SELECT 1 FROM sqlite_temp_master WHERE name = '_hand_sets_version'").fetchone():
+            if self.conn.execute('SELECT ingest_version FROM _hand_sets_version').fetchone() == (version,):
+                return
+        self.conn.executescript(HAND_SETS_DDL)
+        with self.conn:
+            self.conn.execute('INSERT INTO _hand_sets_version (ingest_version) VALUES (?)', (version,))
+
+    def _ensure_hand_facts(self):
+        # Per (hand, player) money, seat and preflop flags shared by the per-player views.
+        # Every load bumps ingest_version; the first read after that rebuilds the table
+        version = read_ingest_version(self.conn)
+        if self.conn.execute('SELECT ingest_version FROM hand_facts_version').fetchone() == (version,):
+            return
+        with self.conn:
+            backfill_hand_combos(self.conn)
+            self.conn.execute('DELETE FROM hand_facts')
+            self.conn.execute(HAND_FACTS_QUERY)
+            self.conn.execute('DELETE FROM hand_facts_version')
+            self.conn.execute('INSERT INTO hand_facts_version (ingest_version) VALUES (?)', (version,))
+
+    def _cached_query(self, query, params=()):
+        # Execute through the connection's statement cache and build the frame from the cursor
+        cursor = self.conn.execute(query, params)
+        columns = [col[0] for col in cursor.description]
+        return pd.DataFrame.from_records(cursor.fetchall(), columns=columns, coerce_float=True)
+
+    def get_priors(self, player_id=None):
+        self._ensure_display_names()
+        self._ensure_hand_facts()
+        return self._priors(player_id)
+
+    # The underscored readers below assume _ensure_hand_facts (and display names) already ran
+
+    def _priors(self, player_id=None):
+        where, params = ('WHERE hf.player_id = ?', (player_id,)) if player_id is not None else ('', ())
+        query = f"""
         SELECT
-            ph.player_id,
-            tn.player_name as display_name,
-            ph.total_hands,
-            COALESCE(v.vpip_hands, 0) as vpip_hands,
-            COALESCE(p.pfr_hands, 0) as pfr_hands,
-            COALESCE(t.three_bet_hands, 0) as three_bet_hands,
-            ROUND(CAST(COALESCE(v.vpip_hands, 0) AS FLOAT) / ph.total_hands * 100, 2) as vpip_pct,
-            ROUND(CAST(COALESCE(p.pfr_hands, 0) AS FLOAT) / ph.total_hands * 100, 2) as pfr_pct,
-            ROUND(CAST(COALESCE(t.three_bet_hands, 0) AS FLOAT) / ph.total_hands * 100, 2) as three_bet_pct
-        FROM player_hands ph
-        LEFT JOIN top_names tn ON ph.player_id = tn.player_id AND tn.rn = 1
-        LEFT JOIN vpip_hands v ON ph.player_id = v.player_id
-        LEFT JOIN pfr_hands p ON ph.player_id = p.player_id
-        LEFT JOIN three_bet_hands t ON ph.player_id = t.player_id
+            hf.player_id,
+            tn.display_name,
+            COUNT(*) as total_hands,
+            SUM(hf.vpip_flag) as vpip_hands,
+            SUM(hf.pfr_flag) as pfr_hands,
+            SUM(hf.three_bet_flag) as three_bet_hands,
+            ROUND(CAST(SUM(hf.vpip_flag) AS FLOAT) / COUNT(*) * 100, 2) as vpip_pct,
+            ROUND(CAST(SUM(hf.pfr_flag) AS FLOAT) / COUNT(*) * 100, 2) as pfr_pct,
+            ROUND(CAST(SUM(hf.three_bet_flag) AS FLOAT) / COUNT(*) * 100, 2) as three_bet_pct
+        FROM hand_facts hf
+        LEFT JOIN player_display_names tn ON hf.player_id = tn.player_id
+        {where}
+        GROUP BY hf.player_id
         """
-        return pd.read_sql_query(query, self.conn)
+        return self._cached_query(query, params)
 
     def get_profit_loss_by_position(self, player_id):
+        self._ensure_hand_facts()
+        return self._profit_loss_by_position(player_id)
+
+    def _profit_loss_by_position(self, player_id):
         query = """
-        WITH player_street_investment AS (
-            SELECT hand_id, stage, MAX(amount) as street_max
-            FROM events
-            WHERE player_id = ? AND action IN ('post_sb', 'post_bb', 'post_other', 'call', 'raise', 'bet', 'raise_to_amount')
-            GROUP BY hand_id, stage
-        ),
-        player_investment AS (
-            SELECT hand_id, SUM(street_max) as invested
-            FROM player_street_investment
-            GROUP BY hand_id
-        ),
-        player_returned AS (
-            SELECT hand_id, SUM(amount) as returned
-            FROM events
-            WHERE player_id = ? AND action = 'returned'
-            GROUP BY hand_id
-        ),
-        player_collected AS (
-            SELECT hand_id, SUM(amount) as collected
-            FROM events
-            WHERE player_id = ? AND action = 'collect'
-            GROUP BY hand_id
-        ),
-        positions AS (
-            SELECT hand_id, player_id,
-                   RANK() OVER(PARTITION BY hand_id ORDER BY id ASC) as pos_rank
-            FROM events
-            WHERE stage = 'Preflop' AND (action LIKE 'post_%' OR action IN ('fold','call','raise','check'))
-            GROUP BY hand_id, player_id
-        ),
-        hand_counts AS (
-            SELECT hand_id, COUNT(DISTINCT player_id) as num_players
-            FROM events
-            WHERE stage = 'Preflop' AND (action LIKE 'post_%' OR action IN ('fold','call','raise','check'))
-            GROUP BY hand_id
-        )
         SELECT
-            pi.hand_id,
-            pos.pos_rank,
-            hc.num_players,
-            COALESCE(pc.collected, 0) + COALESCE(pr.returned, 0) - pi.invested as net_profit
-        FROM player_investment pi
-        LEFT JOIN player_collected pc ON pi.hand_id = pc.hand_id
-        LEFT JOIN player_returned pr ON pi.hand_id = pr.hand_id
-        LEFT JOIN positions pos ON pi.hand_id = pos.hand_id AND pos.player_id = ?
-        LEFT JOIN hand_counts hc ON pi.hand_id = hc.hand_id
+            hand_id,
+            pos_rank,
+            num_players,
+            collected + returned - invested as net_profit
+        FROM hand_facts
+        WHERE player_id = ? AND invested IS NOT NULL
         """
         # Note: Invested amounts are slightly inaccurate because "raise" amount is total bet, but good enough for MVP visualization.
 
-        df = pd.read_sql_query(query, self.conn, params=(player_id, player_id, player_id, player_id))
-
-        # Map pos_rank to something like SB, BB, UTG, etc.
-        def map_pos(row):
-            rank = row['pos_rank']
-            n = row['num_players']
-
-            if pd.isna(rank) or pd.isna(n):
-                return 'Unknown'
+        df = self._cached_query(query, (player_id,))
 
-            rank = int(rank)
-            n = int(n)
-
-            if n == 2:
-                if rank == 1: return 'BTN/SB'
-                if rank == 2: return 'BB'
-                return f'Pos {rank}'
-
-            if rank == 1: return 'SB'
-            if rank == 2: return 'BB'
-            if rank == n: return 'BTN'
-            if rank == n - 1: return 'CO'
-            if rank == n - 2: return 'HJ'
-
-            if rank == 3: return 'UTG'
-            if rank == 4: return 'UTG+1' if n >= 8 else 'MP'
-            if rank == 5: return 'MP' if n >= 9 else 'MP+1'
-            if rank == 6: return 'MP+1'
-
-            return f'Pos {rank}'
-
-        df['position'] = df.apply(map_pos, axis=1)
+        df['position'] = _vectorized_map_pos(df['pos_rank'], df['num_players'])
 
         result = df.groupby('position')['net_profit'].sum().reset_index()
         # Ensure ordering
-        pos_order = ['BTN/SB', 'SB', 'BB', 'UTG', 'UTG+1', 'MP', 'MP+1', 'HJ', 'CO', 'BTN', 'Unknown']
-        cat_dtype = pd.CategoricalDtype(categories=[p for p in pos_order if p in result['position'].values]+list(set(result['position'])-set(pos_order)), ordered=True)
-        result['position'] = result['position'].astype(cat_dtype)
-        return result.sort_values('position')
-
-    def get_bet_sizing_frequencies(self):
-        query = """
-        WITH top_names AS (
-            SELECT player_id, player_name as display_name,
-                   ROW_NUMBER() OVER(PARTITION BY player_id ORDER BY COUNT(*) DESC) as rn
-            FROM players
-            GROUP BY player_id, player_name
+        return _sort_by_position(result)
+
+    def get_bet_sizing_frequencies(self, player_id=None):
+        where, params = ('AND e.player_id = ?', (player_id,)) if player_id is not None else ('', ())
+        # Bucket each bet relative to the pot and count per player in SQL, so only the counts come back
+        query = f"""
+        WITH bets AS (
+            SELECT e.player_id, CAST(e.amount AS REAL) / e.pot_size as pct_of_pot
+            FROM events e
+            WHERE e.stage IN ('Flop', 'Turn', 'River') AND e.action IN ('bet', 'raise', 'raise_to_amount') AND e.pot_size > 0
+            AND e.amount IS NOT NULL
+            {where}
         )
         SELECT
-            e.player_id,
-            tn.display_name,
-            e.amount,
-            e.pot_size
-        FROM events e
-        LEFT JOIN top_names tn ON e.player_id = tn.player_id AND tn.rn = 1
-        WHERE e.stage IN ('Flop', 'Turn', 'River') AND e.action IN ('bet', 'raise', 'raise_to_amount') AND e.pot_size > 0
+            player_id,
+            CASE
+                WHEN pct_of_pot < 0.33 THEN '{BET_SIZE_LABELS[0]}'
+                WHEN pct_of_pot <= 0.66 THEN '{BET_SIZE_LABELS[1]}'
+                ELSE '{BET_SIZE_LABELS[2]}'
+            END as bet_size_category,
+            COUNT(*) as bets
+        FROM bets
+        GROUP BY player_id, bet_size_category
         """
-        df = pd.read_sql_query(query, self.conn)
-
+        df = self._cached_query(query, params)
         if df.empty:
-            return df
-
-        # Calculate bet size relative to pot
-        df['pct_of_pot'] = df['amount'] / df['pot_size']
-
-        def categorize_bet(pct):
-            if pct < 0.33: return 'Small (<33%)'
-            elif pct <= 0.66: return 'Medium (33-66%)'
-            else: return 'Large (>66%)'
-
-        df['bet_size_category'] = df['pct_of_pot'].apply(categorize_bet)
-
-        # We can group by player_id and display_name
-        return df.groupby(['player_id', 'bet_size_category']).size().unstack(fill_value=0)
-
-
-    def _normalize_hole_cards(self, cards_str):
-        import pandas as pd
-        if pd.isna(cards_str) or not cards_str:
-            return 'Unknown'
-        cards = cards_str.split(',')
-        if len(cards) != 2:
-            return 'Unknown'
-
-        ranks = [c[0] for c in cards]
-        suits = [c[1] for c in cards]
-
-        rank_order = {'A': 14, 'K': 13, 'Q': 12, 'J': 11, 'T': 10, '9': 9, '8': 8, '7': 7, '6': 6, '5': 5, '4': 4, '3': 3, '2': 2}
+            return pd.DataFrame()
 
-        try:
-            r1, r2 = ranks[0], ranks[1]
-            if rank_order[r1] < rank_order[r2]:
-                r1, r2 = r2, r1
-                s1, s2 = suits[1], suits[0]
-            else:
-                s1, s2 = suits[0], suits[1]
-        except KeyError:
-            return cards_str
-
-        if r1 == r2:
-            return f"{r1}{r2}"
-        else:
-            suited = 's' if s1 == s2 else 'o'
-            return f"{r1}{r2}{suited}"
+        result = df.pivot(index='player_id', columns='bet_size_category', values='bets').fillna(0).astype('int64')
+        return result[[label for label in BET_SIZE_LABELS if label in result.columns]]
 
     def get_pnl_by_hand(self, player_id):
+        self._ensure_hand_facts()
+        return self._pnl_by_hand(player_id)
+
+    def _pnl_by_hand(self, player_id):
         query = '''
-        WITH player_street_investment AS (
-            SELECT hand_id, stage, MAX(amount) as street_max
-            FROM events
-            WHERE player_id = ? AND action IN ('post_sb', 'post_bb', 'post_other', 'call', 'raise', 'bet', 'raise_to_amount')
-            GROUP BY hand_id, stage
-        ),
-        player_investment AS (
-            SELECT hand_id, SUM(street_max) as invested
-            FROM player_street_investment
-            GROUP BY hand_id
-        ),
-        player_returned AS (
-            SELECT hand_id, SUM(amount) as returned
-            FROM events
-            WHERE player_id = ? AND action = 'returned'
-            GROUP BY hand_id
-        ),
-        player_collected AS (
-            SELECT hand_id, SUM(amount) as collected
-            FROM events
-            WHERE player_id = ? AND action = 'collect'
-            GROUP BY hand_id
-        ),
-        player_pnl AS (
-            SELECT
-                pi.hand_id,
-                COALESCE(pc.collected, 0) + COALESCE(pr.returned, 0) - pi.invested as net_profit
-            FROM player_investment pi
-            LEFT JOIN player_collected pc ON pi.hand_id = pc.hand_id
-            LEFT JOIN player_returned pr ON pi.hand_id = pr.hand_id
-        )
         SELECT
-            ph.hole_cards,
+            ph.hand_combo,
             COUNT(*) as times_dealt,
-            SUM(pnl.net_profit) as total_pnl
+            SUM(pnl.collected + pnl.returned - pnl.invested) as total_pnl
         FROM player_hand_cards ph
-        JOIN player_pnl pnl ON ph.hand_id = pnl.hand_id
-        WHERE ph.player_id = ?
-        GROUP BY ph.hole_cards
+        JOIN hand_facts pnl ON ph.hand_id = pnl.hand_id AND ph.player_id = pnl.player_id
+        WHERE ph.player_id = ? AND pnl.invested IS NOT NULL
+        GROUP BY ph.hand_combo
         ORDER BY total_pnl DESC
         '''
-        df = pd.read_sql_query(query, self.conn, params=(player_id, player_id, player_id, player_id))
-        if df.empty:
-            return df
-
-        df['hand_combo'] = df['hole_cards'].apply(self._normalize_hole_cards)
-        summary = df.groupby('hand_combo').agg(
-            times_dealt=('times_dealt', 'sum'),
-            total_pnl=('total_pnl', 'sum')
-        ).reset_index()
-        return summary.sort_values('total_pnl', ascending=False)
+        return self._cached_query(query, (player_id,))
 
     def get_positional_stats(self, player_id):
+        self._ensure_hand_facts()
+        return self._positional_stats(player_id)
+
+    def _positional_stats(self, player_id):
         query = '''
-        WITH positions AS (
-            SELECT hand_id, player_id,
-                   RANK() OVER(PARTITION BY hand_id ORDER BY id ASC) as pos_rank
-            FROM events
-            WHERE stage = 'Preflop' AND (action LIKE 'post_%' OR action IN ('fold','call','raise','check'))
-            GROUP BY hand_id, player_id
-        ),
-        hand_counts AS (
-            SELECT hand_id, COUNT(DISTINCT player_id) as num_players
-            FROM events
-            WHERE stage = 'Preflop' AND (action LIKE 'post_%' OR action IN ('fold','call','raise','check'))
-            GROUP BY hand_id
-        ),
-        player_actions AS (
-            SELECT hand_id,
-                   MAX(CASE WHEN action IN ('call', 'raise', 'raise_to_amount') AND NOT action IN ('post_sb', 'post_bb') THEN 1 ELSE 0 END) as vpip_flag,
-                   MAX(CASE WHEN action LIKE 'raise%' THEN 1 ELSE 0 END) as pfr_flag
-            FROM events
-            WHERE player_id = ? AND stage = 'Preflop'
-            GROUP BY hand_id
-        ),
-        three_bet AS (
-            SELECT e1.hand_id, 1 as three_bet_flag
-            FROM events e1
-            JOIN events e2 ON e1.hand_id = e2.hand_id
-              AND e2.stage = 'Preflop' AND e2.action LIKE 'raise%'
-              AND e1.id > e2.id
-            WHERE e1.player_id = ? AND e1.stage = 'Preflop' AND e1.action LIKE 'raise%'
-            GROUP BY e1.hand_id
-        )
         SELECT
-            pos.pos_rank,
-            hc.num_players,
-            COUNT(pos.hand_id) as total_hands,
-            SUM(COALESCE(pa.vpip_flag, 0)) as vpip_hands,
-            SUM(COALESCE(pa.pfr_flag, 0)) as pfr_hands,
-            SUM(COALESCE(tb.three_bet_flag, 0)) as three_bet_hands
-        FROM positions pos
-        LEFT JOIN hand_counts hc ON pos.hand_id = hc.hand_id
-        LEFT JOIN player_actions pa ON pos.hand_id = pa.hand_id
-        LEFT JOIN three_bet tb ON pos.hand_id = tb.hand_id
-        WHERE pos.player_id = ?
-        GROUP BY pos.pos_rank, hc.num_players
+            pos_rank,
+            num_players,
+            COUNT(*) as total_hands,
+            SUM(vpip_flag) as vpip_hands,
+            SUM(pfr_flag) as pfr_hands,
+            SUM(three_bet_flag) as three_bet_hands
+        FROM hand_facts
+        WHERE player_id = ? AND pos_rank IS NOT NULL
+        GROUP BY pos_rank, num_players
         '''
-        import pandas as pd
-        df = pd.read_sql_query(query, self.conn, params=(player_id, player_id, player_id))
+        df = self._cached_query(query, (player_id,))
 
         if df.empty:
             return df
 
-        def map_pos(row):
-            rank = row['pos_rank']
-            n = row['num_players']
-            if pd.isna(rank) or pd.isna(n):
-                return 'Unknown'
-            rank, n = int(rank), int(n)
-
-            if n == 2:
-                if rank == 1: return 'BTN/SB'
-                if rank == 2: return 'BB'
-                return f'Pos {rank}'
-            if rank == 1: return 'SB'
-            if rank == 2: return 'BB'
-            if rank == n: return 'BTN'
-            if rank == n - 1: return 'CO'
-            if rank == n - 2: return 'HJ'
-            if rank == 3: return 'UTG'
-            if rank == 4: return 'UTG+1' if n >= 8 else 'MP'
-            if rank == 5: return 'MP' if n >= 9 else 'MP+1'
-            if rank == 6: return 'MP+1'
-            return f'Pos {rank}'
-
-        df['position'] = df.apply(map_pos, axis=1)
+        df['position'] = _vectorized_map_pos(df['pos_rank'], df['num_players'])
 
         result = df.groupby('position').agg(
             total_hands=('total_hands', 'sum'),
@@ -360,191 +486,127 @@ class PokerAnalytics:
         result['pfr_pct'] = (result['pfr_hands'] / result['total_hands'] * 100).round(2)
         result['three_bet_pct'] = (result['three_bet_hands'] / result['total_hands'] * 100).round(2)
 
-        pos_order = ['BTN/SB', 'SB', 'BB', 'UTG', 'UTG+1', 'MP', 'MP+1', 'HJ', 'CO', 'BTN', 'Unknown']
-        cat_dtype = pd.CategoricalDtype(categories=[p for p in pos_order if p in result['position'].values]+list(set(result['position'])-set(pos_order)), ordered=True)
-        result['position'] = result['position'].astype(cat_dtype)
-        return result.sort_values('position')
+        return _sort_by_position(result)
 
 
+    def get_player_profile(self, player_id):
+        # Everything the Player Profile view renders, sliced from hand_facts after a single refresh check
+        self._ensure_display_names()
+        self._ensure_hand_facts()
+        return {
+            'priors': self._priors(player_id),
+            'bet_sizing': self.get_bet_sizing_frequencies(player_id),
+            'pnl_by_position': self._profit_loss_by_position(player_id),
+            'positional_stats': self._positional_stats(player_id),
+            'hand_pnl': self._pnl_by_hand(player_id),
+        }
+
     def get_net_pnl_all_players(self):
+        self._ensure_display_names()
+        self._ensure_hand_facts()
         query = """
-        WITH player_street_investment AS (
-            SELECT hand_id, player_id, stage, MAX(amount) as street_max
-            FROM events
-            WHERE action IN ('post_sb', 'post_bb', 'post_other', 'call', 'raise', 'bet', 'raise_to_amount')
-            GROUP BY hand_id, player_id, stage
-        ),
-        player_total_investment AS (
-            SELECT player_id, SUM(street_max) as total_invested
-            FROM player_street_investment
-            GROUP BY player_id
-        ),
-        player_total_returned AS (
-            SELECT player_id, SUM(amount) as total_returned
-            FROM events
-            WHERE action = 'returned'
+        WITH player_totals AS (
+            SELECT player_id,
+                   SUM(invested) as total_invested,
+                   SUM(returned) as total_returned,
+                   SUM(collected) as total_collected
+            FROM hand_facts
             GROUP BY player_id
-        ),
-        player_total_collected AS (
-            SELECT player_id, SUM(amount) as total_collected
-            FROM events
-            WHERE action = 'collect'
-            GROUP BY player_id
-        ),
-        top_names AS (
-            SELECT player_id, player_name as display_name,
-                   ROW_NUMBER() OVER(PARTITION BY player_id ORDER BY COUNT(*) DESC) as rn
-            FROM players
-            GROUP BY player_id, player_name
         )
         SELECT
             tn.player_id,
             tn.display_name,
-            COALESCE(pc.total_collected, 0) + COALESCE(pr.total_returned, 0) - COALESCE(pi.total_invested, 0) as total_net_pnl
-        FROM top_names tn
-        LEFT JOIN player_total_investment pi ON tn.player_id = pi.player_id
-        LEFT JOIN player_total_collected pc ON tn.player_id = pc.player_id
-        LEFT JOIN player_total_returned pr ON tn.player_id = pr.player_id
-        WHERE tn.rn = 1
+            COALESCE(pt.total_collected, 0) + COALESCE(pt.total_returned, 0) - COALESCE(pt.total_invested, 0) as total_net_pnl
+        FROM player_display_names tn
+        LEFT JOIN player_totals pt ON tn.player_id = pt.player_id
         ORDER BY total_net_pnl DESC
         """
-        return pd.read_sql_query(query, self.conn)
+        return self._cached_query(query)
 
     def map_hand_strength(self, hand_desc):
         if not hand_desc:
             return 0
         desc = str(hand_desc).lower()
-        if 'royal flush' in desc or 'straight flush' in desc: return 8
-        if 'four of a kind' in desc or 'quads' in desc: return 7
-        if 'full house' in desc: return 6
-        if 'flush' in desc: return 5
-        if 'straight' in desc: return 4
-        if 'three of a kind' in desc or 'set' in desc or 'trips' in desc: return 3
-        if 'two pair' in desc: return 2
-        if 'pair' in desc: return 1
+        for keywords, strength in HAND_STRENGTHS:
+            if any(k in desc for k in keywords):
+                return strength
         return 0 # High card or unknown
 
     def calculate_and_store_player_priors(self, hero_id="EJd9KHwjJa"):
-        import json
-
         base_stats = self.get_priors()
         if base_stats.empty:
             return
 
+        self._ensure_hand_sets()
+        # Every hand set is unique on (player_id, hand_id), so the 1:1 joins need no DISTINCT
         query = """
-        WITH base_players AS (
-            SELECT DISTINCT player_id, hand_id
-            FROM events
-            WHERE player_id != 'Dealer' AND action NOT IN ('deal_flop', 'deal_turn', 'deal_river')
-        ),
-        flops AS (
-            SELECT DISTINCT hand_id FROM events WHERE action = 'deal_flop'
-        ),
-        folds AS (
-            SELECT DISTINCT player_id, hand_id FROM events WHERE action = 'fold'
-        ),
-        preflop_folds AS (
-            SELECT DISTINCT player_id, hand_id FROM events WHERE stage = 'Preflop' AND action = 'fold'
-        ),
-        saw_flop AS (
-            SELECT bp.player_id, bp.hand_id
-            FROM base_players bp
-            JOIN flops f ON bp.hand_id = f.hand_id
-            LEFT JOIN preflop_folds pf ON bp.hand_id = pf.hand_id AND bp.player_id = pf.player_id
-            WHERE pf.player_id IS NULL
-        ),
-        survivors AS (
-            SELECT bp.player_id, bp.hand_id
-            FROM base_players bp
-            LEFT JOIN folds f ON bp.player_id = f.player_id AND bp.hand_id = f.hand_id
-            WHERE f.player_id IS NULL
-        ),
-        showdown_hands AS (
-            SELECT hand_id FROM survivors GROUP BY hand_id HAVING COUNT(player_id) > 1
-        ),
-        showdowns AS (
-            SELECT s.player_id, s.hand_id
-            FROM survivors s
-            JOIN showdown_hands sh ON s.hand_id = sh.hand_id
-        ),
-        wins AS (
-            SELECT DISTINCT player_id, hand_id FROM events WHERE action = 'collect'
-        ),
-        river_raises AS (
-            SELECT DISTINCT player_id, hand_id FROM events WHERE stage = 'River' AND action IN ('raise', 'bet', 'raise_to_amount')
-        ),
-        river_bluffs AS (
-            SELECT rr.player_id, rr.hand_id
-            FROM river_raises rr
-            JOIN showdowns s ON rr.hand_id = s.hand_id AND rr.player_id = s.player_id
-            LEFT JOIN wins w ON rr.hand_id = w.hand_id AND rr.player_id = w.player_id
-            WHERE w.player_id IS NULL
-        ),
-        river_raise_opps AS (
-            SELECT rr.player_id, rr.hand_id
-            FROM river_raises rr
-            JOIN showdowns s ON rr.hand_id = s.hand_id AND rr.player_id = s.player_id
-        )
         SELECT
             bp.player_id,
-            COUNT(DISTINCT sf.hand_id) as flops_seen,
-            COUNT(DISTINCT s.hand_id) as showdowns_seen,
-            COUNT(DISTINCT sf_w.hand_id) as flops_won,
-            COUNT(DISTINCT s_w.hand_id) as showdowns_won,
-            COUNT(DISTINCT rb.hand_id) as river_bluffs,
-            COUNT(DISTINCT rro.hand_id) as river_raise_opps
-        FROM base_players bp
-        LEFT JOIN saw_flop sf ON bp.player_id = sf.player_id AND bp.hand_id = sf.hand_id
-        LEFT JOIN showdowns s ON bp.player_id = s.player_id AND bp.hand_id = s.hand_id
-        LEFT JOIN wins sf_w ON sf.player_id = sf_w.player_id AND sf.hand_id = sf_w.hand_id
-        LEFT JOIN wins s_w ON s.player_id = s_w.player_id AND s.hand_id = s_w.hand_id
-        LEFT JOIN river_bluffs rb ON bp.player_id = rb.player_id AND bp.hand_id = rb.hand_id
-        LEFT JOIN river_raise_opps rro ON bp.player_id = rro.player_id AND bp.hand_id = rro.hand_id
+            COUNT(sf.hand_id) as flops_seen,
+            COUNT(s.hand_id) as showdowns_seen,
+            COUNT(sf_w.hand_id) as flops_won,
+            COUNT(s_w.hand_id) as showdowns_won,
+            COUNT(rb.hand_id) as river_bluffs,
+            COUNT(rro.hand_id) as river_raise_opps
+        FROM _base_players bp
+        LEFT JOIN _saw_flop sf ON bp.player_id = sf.player_id AND bp.hand_id = sf.hand_id
+        LEFT JOIN _showdowns s ON bp.player_id = s.player_id AND bp.hand_id = s.hand_id
+        LEFT JOIN _wins sf_w ON sf.player_id = sf_w.player_id AND sf.hand_id = sf_w.hand_id
+        LEFT JOIN _wins s_w ON s.player_id = s_w.player_id AND s.hand_id = s_w.hand_id
+        LEFT JOIN _river_bluffs rb ON bp.player_id = rb.player_id AND bp.hand_id = rb.hand_id
+        LEFT JOIN _river_raise_opps rro ON bp.player_id = rro.player_id AND bp.hand_id = rro.hand_id
         GROUP BY bp.player_id
         """
-        adv_stats = pd.read_sql_query(query, self.conn)
+        adv_stats = self._cached_query(query)
 
         # Showdown strengths
-        showdown_query = "SELECT player_id, raw_entry FROM events WHERE action = 'show' OR stage = 'Showdown'"
-        shows_df = pd.read_sql_query(showdown_query, self.conn)
-
-        player_strengths = {}
-        for _, row in shows_df.iterrows():
-            pid = row['player_id']
-            try:
-                payload = json.loads(row['raw_entry'])
-                desc = None
-                if 'hand' in payload and isinstance(payload['hand'], dict):
-                    desc = payload['hand'].get('name') or payload['hand'].get('description')
-                if not desc:
-                    desc = str(payload)
-
-                val = self.map_hand_strength(desc)
-                if pid not in player_strengths:
-                    player_strengths[pid] = []
-                player_strengths[pid].append(val)
-            except:
-                pass
-
-        cursor = self.conn.cursor()
-
-        for _, row in base_stats.iterrows():
-            pid = row['player_id']
-            hands = row['total_hands']
-            vpip = row['vpip_pct']
-            pfr = row['pfr_pct']
-            three_bet = row['three_bet_pct']
-
-            adv = adv_stats[adv_stats['player_id'] == pid]
+        # Pull the hand description out in SQLite so only the short string reaches Python;
+        # unparseable entries come back NULL and drop out of the average
+        showdown_query = """
+        SELECT
+            player_id,
+            CASE WHEN json_valid(raw_entry) THEN COALESCE(
+                NULLIF(json_extract(raw_entry, '$.hand.name'), ''),
+                NULLIF(json_extract(raw_entry, '$.hand.description'), ''),
+                raw_entry
+            ) END as hand_desc
+        FROM events
+        WHERE action = 'show' OR stage = 'Showdown'
+        """
+        shows_df = self._cached_query(showdown_query)
+
+        desc = shows_df['hand_desc'].str.lower().fillna('')
+        # Only a handful of distinct descriptions exist, so classify each once and broadcast back by code
+        codes, uniques = pd.factorize(desc)
+        uniques = pd.Series(uniques, dtype=object)
+        strengths = np.select(
+            [uniques.str.contains('|'.join(keywords)).to_numpy(dtype=bool) for keywords, _ in HAND_STRENGTHS],
+            [strength for _, strength in HAND_STRENGTHS],
+            default=0
+        )
+        shows_df['strength'] = strengths[codes]
+        # Filter out 0s if we failed to parse
+        strength_map = shows_df.query('strength > 0').groupby('player_id')['strength'].mean().round(2).to_dict()
+
+        adv_map = adv_stats.set_index('player_id').to_dict('index')
+        records = []
+
+        for row in base_stats.itertuples(index=False):
+            pid = row.player_id
+            hands = row.total_hands
+            vpip = row.vpip_pct
+            pfr = row.pfr_pct
+            three_bet = row.three_bet_pct
+
             wtsd_pct = 0.0
             wsd_pct = 0.0
             wwsf_pct = 0.0
             river_bluff_freq = 0.0
-            avg_strength = 0.0
+            avg_strength = strength_map.get(pid, 0.0)
             profile_tag = "Unknown"
 
-            if not adv.empty:
-                adv = adv.iloc[0]
+            adv = adv_map.get(pid)
+            if adv is not None:
                 flops_seen = adv['flops_seen']
                 showdowns_seen = adv['showdowns_seen']
                 flops_won = adv['flops_won']
@@ -562,11 +624,6 @@ class PokerAnalytics:
                 if r_opps > 0:
                     river_bluff_freq = round((r_bluffs / r_opps) * 100, 2)
 
-            if pid in player_strengths and len(player_strengths[pid]) > 0:
-                vals = [v for v in player_strengths[pid] if v > 0] # Filter out 0s if we failed to parse
-                if vals:
-                    avg_strength = round(sum(vals) / len(vals), 2)
-
             if hands >= 10: # Lowered requirement slightly to actually test on short datasets, though requirement was 50
                 if avg_strength <= 1.5 and avg_strength > 0:
                     profile_tag = "Bluff-Heavy/Station"
@@ -575,34 +632,34 @@ class PokerAnalytics:
                 else:
                     profile_tag = "Regular"
 
-            cursor.execute('''
+            records.append((pid, hands, vpip, pfr, three_bet, wtsd_pct, wsd_pct, wwsf_pct, river_bluff_freq, avg_strength, profile_tag))
+
+        # One transaction and one prepared statement for the whole batch
+        with self.conn:
+            self.conn.executemany('''
             INSERT OR REPLACE INTO player_priors
             (player_id, total_hands, vpip_pct, pfr_pct, three_bet_pct, wtsd_pct, wsd_pct, wwsf_pct, river_bluff_freq, avg_showdown_strength, profile_tag)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (pid, hands, vpip, pfr, three_bet, wtsd_pct, wsd_pct, wwsf_pct, river_bluff_freq, avg_strength, profile_tag))
-
-        self.conn.commit()
+            ''', records)
 
     def get_exploit_targets(self):
         query = """
-        SELECT pp.*, p.player_name as display_name
+        SELECT pp.*, p.display_name
         FROM player_priors pp
-        LEFT JOIN (
-            SELECT player_id, player_name, ROW_NUMBER() OVER(PARTITION BY player_id ORDER BY COUNT(*) DESC) as rn
-            FROM players GROUP BY player_id, player_name
-        ) p ON pp.player_id = p.player_id AND p.rn = 1
+        LEFT JOIN player_display_names p ON pp.player_id = p.player_id
         WHERE pp.total_hands >= 50
         ORDER BY pp.wtsd_pct DESC
         """
         try:
-            return pd.read_sql_query(query, self.conn)
+            self._ensure_display_names()
+            return self._cached_query(query)
         except Exception as e:
             return pd.DataFrame()
 
     def get_hero_leaks(self, hero_id="EJd9KHwjJa"):
         try:
             query = "SELECT * FROM player_priors WHERE player_id = ?"
-            df = pd.read_sql_query(query, self.conn, params=(hero_id,))
+            df = self._cached_query(query, (hero_id,))
             if df.empty:
                 return None
 
@@ -632,11 +689,12 @@ class PokerAnalytics:
 if __name__ == "__main__":
     analytics = PokerAnalytics()
     print("=== Priors ===")
-    print(analytics.get_priors())
+    priors = analytics.get_priors()
+    print(priors)
     print("\n=== Post-flop Bet Sizing Frequencies ===")
     print(analytics.get_bet_sizing_frequencies())
     print("\n=== Profit/Loss By Position for 'Me' ===")
     # Just grab the first ID for testing
-    first_id = analytics.get_priors()['player_id'].iloc[0]
+    first_id = priors['player_id'].iloc[0]
     print(f"Testing for ID: {first_id}")
     print(analytics.get_profit_loss_by_position(first_id))
@@ -5,6 +5,7 @@ import seaborn as sns
 import matplotlib.pyplot as plt
 import subprocess
 import os
+import io
 from analytics import PokerAnalytics
 
 st.set_page_config(page_title="PokerNow Analytics MVP", layout="wide")
@@ -47,7 +48,76 @@ def get_analytics():
 
 analytics = get_analytics()
 
-priors_df = analytics.get_priors()
+# Query results keyed by the ingest version so sidebar reruns reuse them until a load lands.
+# File mtimes don't work here: opening the database in WAL mode touches the -wal file on every rerun
+@st.cache_data(show_spinner=False, max_entries=4)
+def cached_priors(db_version):
+    return get_analytics().get_priors()
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def cached_player_profile(player_id, db_version):
+    return get_analytics().get_player_profile(player_id)
+
+def figure_png(fig):
+    # Same rendering st.pyplot uses, but as bytes that st.cache_data can keep
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=200, bbox_inches='tight')
+    plt.close(fig)
+    return buf.getvalue()
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def render_position_heatmap_png(player_id, db_version):
+    # We want to display this as a heatmap. So we format it into a 1-row pivot
+    pl_df = cached_player_profile(player_id, db_version)['pnl_by_position'].set_index('position').T
+
+    fig, ax = plt.subplots(figsize=(8, 2))
+    sns.heatmap(pl_df, annot=True, cmap="RdYlGn", center=0, cbar=True, ax=ax, fmt=".1f")
+    ax.set_yticklabels(["Net Profit"], rotation=0)
+    ax.set_xlabel("Table Position")
+    return figure_png(fig)
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def render_hand_pnl_png(player_id, db_version):
+    hand_pnl_df = cached_player_profile(player_id, db_version)['hand_pnl']
+    ranks = ['A', 'K', 'Q', 'J', 'T', '9', '8', '7', '6', '5', '4', '3', '2']
+    rank_idx = {r: i for i, r in enumerate(ranks)}
+
+    # Populate matrix: pairs on the diagonal, suited above it, offsuit below
+    combos = hand_pnl_df['hand_combo']
+    suffix = combos.str[2:]
+    r1 = combos.str[0].map(rank_idx)
+    r2 = combos.str[1].map(rank_idx)
+    keep = (combos.str.len().isin([2, 3]) & suffix.isin(['', 's', 'o']) & r1.notna() & r2.notna()).to_numpy()
+    r1 = r1.to_numpy()[keep].astype(int)
+    r2 = r2.to_numpy()[keep].astype(int)
+    offsuit = (suffix.to_numpy()[keep] == 'o')
+    values = np.full((len(ranks), len(ranks)), np.nan)
+    values[np.where(offsuit, r2, r1), np.where(offsuit, r1, r2)] = hand_pnl_df['total_pnl'].to_numpy()[keep]
+    pnl_matrix = pd.DataFrame(values, index=ranks, columns=ranks)
+
+    # Generate annotations
+    annot_matrix = pd.DataFrame([
+        [
+            (f"{r}{c}" if i == j else f"{r}{c}s" if i < j else f"{c}{r}o") + ("" if np.isnan(values[i, j]) else f"\n{values[i, j]:.0f}")
+            for j, c in enumerate(ranks)
+        ]
+        for i, r in enumerate(ranks)
+    ], index=ranks, columns=ranks)
+
+    fig, ax = plt.subplots(figsize=(10, 10))
+    sns.heatmap(pnl_matrix, annot=annot_matrix, fmt="", cmap="RdYlGn", center=0,
+                cbar_kws={'label': 'Net PnL'}, ax=ax, linewidths=0.5, linecolor='gray',
+                annot_kws={"size": 8})
+
+    # Move x-axis labels to top
+    ax.xaxis.tick_top()
+    ax.xaxis.set_label_position('top')
+    ax.set_aspect('equal')
+    return figure_png(fig)
+
+db_version = analytics.get_ingest_version()
+
+priors_df = cached_priors(db_version)
 if not priors_df.empty:
     priors_df = priors_df[priors_df['total_hands'] >= 50]
 
@@ -116,10 +186,7 @@ elif view_mode == "Player Profile":
     st.sidebar.header("Player Search")
     if not priors_df.empty:
         # Create a mapping dictionary of formatted name -> player_id
-        player_options = {}
-        for _, row in priors_df.iterrows():
-            display_label = f"{row['display_name']} ({row['player_id']})"
-            player_options[display_label] = row['player_id']
+        player_options = {f"{name} ({pid})": pid for pid, name in zip(priors_df['player_id'], priors_df['display_name'])}
 
         selected_label = st.sidebar.selectbox("Select a Player", list(player_options.keys()))
 
@@ -131,7 +198,8 @@ elif view_mode == "Player Profile":
 
             # 1. Priors Section
             st.subheader("Priors (Preflop Statistics)")
-        player_priors = priors_df[priors_df['player_id'] == selected_player_id].iloc[0]
+        profile = cached_player_profile(selected_player_id, db_version)
+        player_priors = profile['priors'].iloc[0]
 
         col1, col2, col3, col4 = st.columns(4)
         col1.metric("Total Hands", int(player_priors['total_hands']))
@@ -143,7 +211,7 @@ elif view_mode == "Player Profile":
 
         # 2. Bet Sizing Frequencies
         st.subheader("Post-Flop Bet-Sizing Frequencies")
-        bet_sizing_df = analytics.get_bet_sizing_frequencies()
+        bet_sizing_df = profile['bet_sizing']
         if not bet_sizing_df.empty and selected_player_id in bet_sizing_df.index:
             player_bets = bet_sizing_df.loc[[selected_player_id]]
             st.bar_chart(player_bets.T)
@@ -154,17 +222,10 @@ elif view_mode == "Player Profile":
 
         # 3. Positional Heatmap
         st.subheader(f"Positional Profit/Loss Heatmap for {display_name}")
-        pl_df = analytics.get_profit_loss_by_position(selected_player_id)
+        pl_df = profile['pnl_by_position']
 
         if not pl_df.empty:
-            # We want to display this as a heatmap. So we format it into a 1-row pivot
-            pl_df = pl_df.set_index('position').T
-
-            fig, ax = plt.subplots(figsize=(8, 2))
-            sns.heatmap(pl_df, annot=True, cmap="RdYlGn", center=0, cbar=True, ax=ax, fmt=".1f")
-            ax.set_yticklabels(["Net Profit"], rotation=0)
-            ax.set_xlabel("Table Position")
-            st.pyplot(fig)
+            st.image(render_position_heatmap_png(selected_player_id, db_version))
         else:
             st.info("No positional profit/loss data available for this player.")
 
@@ -172,7 +233,7 @@ elif view_mode == "Player Profile":
 
         # 4. Positional Stats (VPIP, PFR, 3-Bet)
         st.subheader("Positional Preflop Statistics")
-        pos_stats_df = analytics.get_positional_stats(selected_player_id)
+        pos_stats_df = profile['positional_stats']
         if not pos_stats_df.empty:
             display_pos_df = pos_stats_df[['position', 'total_hands', 'vpip_pct', 'pfr_pct', 'three_bet_pct']].rename(columns={
                 'position': 'Position',
@@ -197,50 +258,9 @@ elif view_mode == "Player Profile":
 
         # 5. Hand PNL (Preflop Chart)
         st.subheader("Profit/Loss by Hole Cards (Preflop Chart)")
-        hand_pnl_df = analytics.get_pnl_by_hand(selected_player_id)
+        hand_pnl_df = profile['hand_pnl']
         if not hand_pnl_df.empty:
-            ranks = ['A', 'K', 'Q', 'J', 'T', '9', '8', '7', '6', '5', '4', '3', '2']
-            pnl_matrix = pd.DataFrame(index=ranks, columns=ranks, data=np.nan)
-
-            # Populate matrix
-            for _, row in hand_pnl_df.iterrows():
-                combo = row['hand_combo']
-                pnl = row['total_pnl']
-                if combo == 'Unknown' or len(combo) not in [2, 3]:
-                    continue
-                r1, r2 = combo[0], combo[1]
-                if len(combo) == 2:
-                    pnl_matrix.loc[r1, r2] = pnl
-                elif combo[2] == 's':
-                    pnl_matrix.loc[r1, r2] = pnl
-                elif combo[2] == 'o':
-                    pnl_matrix.loc[r2, r1] = pnl
-
-            # Generate annotations
-            annot_matrix = pd.DataFrame(index=ranks, columns=ranks, data="")
-            for r in ranks:
-                for c in ranks:
-                    val = pnl_matrix.loc[r, c]
-                    combo_name = ""
-                    if r == c: combo_name = f"{r}{c}"
-                    elif ranks.index(r) < ranks.index(c): combo_name = f"{r}{c}s"
-                    else: combo_name = f"{c}{r}o"
-
-                    if pd.isna(val):
-                        annot_matrix.loc[r, c] = combo_name
-                    else:
-                        annot_matrix.loc[r, c] = f"{combo_name}\n{val:.0f}"
-
-            fig, ax = plt.subplots(figsize=(10, 10))
-            sns.heatmap(pnl_matrix, annot=annot_matrix, fmt="", cmap="RdYlGn", center=0,
-                        cbar_kws={'label': 'Net PnL'}, ax=ax, linewidths=0.5, linecolor='gray',
-                        annot_kws={"size": 8})
-
-            # Move x-axis labels to top
-            ax.xaxis.tick_top()
-            ax.xaxis.set_label_position('top')
-            ax.set_aspect('equal')
-            st.pyplot(fig)
+            st.image(render_hand_pnl_png(selected_player_id, db_version))
 
             # Optional: Still show top/bottom 5 as a small table below
             st.write("---")
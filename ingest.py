@@ -2,272 +2,482 @@ import sqlite3
 import json
 import argparse
 import os
+import tempfile
+from contextlib import nullcontext
 from datetime import datetime
+from multiprocessing import Pool
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# 'As,Ks' -> 'AKs', 'Jd,Th' -> 'JTo', pairs -> 'QQ'; anything that isn't two cards is 'Unknown'
+# and two cards with unrecognised ranks keep their raw string
+HAND_COMBO_BACKFILL = '''
+UPDATE player_hand_cards SET hand_combo = (
+    CASE
+        WHEN c.c2 IS NULL OR instr(c.c2, ',') > 0 THEN 'Unknown'
+        WHEN c.v1 = 0 OR c.v2 = 0 THEN c.hole_cards
+        ELSE CASE WHEN c.v1 >= c.v2 THEN c.r1 || c.r2 ELSE c.r2 || c.r1 END
+             || CASE WHEN c.r1 = c.r2 THEN '' WHEN c.s1 <> '' AND c.s1 = c.s2 THEN 's' ELSE 'o' END
+    END
+)
+FROM (
+    SELECT id, hole_cards, c2,
+           substr(c1, 1, 1) as r1, substr(c2, 1, 1) as r2,
+           substr(c1, 2, 1) as s1, substr(c2, 2, 1) as s2,
+           CASE WHEN c1 <> '' THEN instr('23456789TJQKA', substr(c1, 1, 1)) ELSE 0 END as v1,
+           CASE WHEN c2 <> '' THEN instr('23456789TJQKA', substr(c2, 1, 1)) ELSE 0 END as v2
+    FROM (
+        SELECT rowid as id, hole_cards,
+               substr(hole_cards, 1, instr(hole_cards, ',') - 1) as c1,
+               CASE WHEN instr(hole_cards, ',') > 0 THEN substr(hole_cards, instr(hole_cards, ',') + 1) END as c2
+        FROM player_hand_cards
+        WHERE hand_combo IS NULL
+    )
+) c
+WHERE player_hand_cards.rowid = c.id
+'''
+
+def backfill_hand_combos(conn):
+    # Databases created before hand_combo existed get the column on first use
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(player_hand_cards)')}
+    if 'hand_combo' not in columns:
+        conn.execute('ALTER TABLE player_hand_cards ADD COLUMN hand_combo TEXT')
+    conn.execute(HAND_COMBO_BACKFILL)
+
+# Columns added to hands after its first release. Older rows keep NULL: units NULL means the
+# amounts are dollars, board_stage NULL means the board is only known from 'Dealer' deal events
+HAND_COLUMNS = {'units': 'TEXT', 'board_stage': 'TEXT'}
+
+def ensure_hand_columns(conn):
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(hands)')}
+    for name, col_type in HAND_COLUMNS.items():
+        if name not in columns:
+            conn.execute(f'ALTER TABLE hands ADD COLUMN {name} {col_type}')
+
+# Bulk-insert tuning: fewer fsyncs, 64MB page cache, mmap'd reads and in-memory temp b-trees
+CONNECTION_PRAGMAS = '''
+PRAGMA synchronous=NORMAL;
+PRAGMA temp_store=MEMORY;
+PRAGMA cache_size=-65536;
+PRAGMA mmap_size=268435456;
+'''
+
+SCHEMA_DDL = '''
+-- Hands table
+CREATE TABLE IF NOT EXISTS hands (
+    hand_id TEXT PRIMARY KEY,
+    dealer_name TEXT,
+    started_at TEXT,
+    units TEXT,     -- 'cents' for integer cent amounts; NULL for older dollar amounts
+    board_stage TEXT -- last street dealt: 'Flop', 'Turn', 'River'; NULL if the hand ended preflop
+);
+
+-- Players table (New mapping for id -> name)
+CREATE TABLE IF NOT EXISTS players (
+    player_id TEXT,
+    player_name TEXT,
+    PRIMARY KEY (player_id, player_name)
+);
+
+-- Player hole cards table
+CREATE TABLE IF NOT EXISTS player_hand_cards (
+    hand_id TEXT,
+    player_id TEXT,
+    hole_cards TEXT,
+    hand_combo TEXT,
+    PRIMARY KEY (hand_id, player_id)
+);
+
+-- Events table
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    hand_id TEXT,
+    player_id TEXT,
+    action TEXT,
+    amount INTEGER, -- in the hand's units
+    pot_size INTEGER,
+    stage TEXT,     -- 'Preflop', 'Flop', 'Turn', 'River', 'Showdown'
+    timestamp INTEGER, -- ms since epoch, as logged
+    raw_entry TEXT,
+    FOREIGN KEY(hand_id) REFERENCES hands(hand_id)
+);
+
+-- Player Priors table (New table for long-term opponent intelligence)
+CREATE TABLE IF NOT EXISTS player_priors (
+    player_id TEXT PRIMARY KEY,
+    total_hands INTEGER,
+    vpip_pct REAL,
+    pfr_pct REAL,
+    three_bet_pct REAL,
+    wtsd_pct REAL,
+    wsd_pct REAL,
+    wwsf_pct REAL,
+    river_bluff_freq REAL,
+    avg_showdown_strength REAL,
+    profile_tag TEXT
+);
+
+-- Processed Games table
+CREATE TABLE IF NOT EXISTS processed_games (
+    game_id TEXT PRIMARY KEY,
+    processed_at TEXT
+);
+
+-- Single-row load counter, bumped in the same transaction as every load so readers can tell
+-- their derived tables are stale
+CREATE TABLE IF NOT EXISTS ingest_version (
+    version INTEGER NOT NULL
+);
+'''
+
+# The load itself only needs the primary keys, so this index is built after the first load
+# rather than being maintained row by row during it. Indexes that already exist, including the
+# ones analytics adds when it opens the database, are maintained row by row by later loads:
+# for an incremental load that is cheaper than rebuilding them over the whole table.
+# ANALYZE then refreshes sqlite_stat1 so the planner sees the new row counts.
+POST_LOAD_INDEXES = '''
+CREATE INDEX IF NOT EXISTS idx_events_hand_id_id ON events(hand_id, id);
+ANALYZE;
+'''
+
+# Statement text is shared by every call so sqlite3's compiled-statement cache keeps hitting
+INSERT_PLAYER_SQL = 'INSERT OR IGNORE INTO players (player_id, player_name) VALUES (?, ?)'
+INSERT_HAND_CARDS_SQL = 'INSERT OR IGNORE INTO player_hand_cards (hand_id, player_id, hole_cards) VALUES (?, ?, ?)'
+INSERT_HAND_SQL = "INSERT OR IGNORE INTO hands (hand_id, dealer_name, started_at, units, board_stage) VALUES (?, ?, ?, 'cents', ?)"
+INSERT_EVENT_SQL = '''
+INSERT INTO events (hand_id, player_id, action, amount, pot_size, stage, timestamp, raw_entry)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+SELECT_PROCESSED_GAME_SQL = 'SELECT game_id FROM processed_games WHERE game_id = ?'
+INSERT_PROCESSED_GAME_SQL = 'INSERT OR IGNORE INTO processed_games (game_id, processed_at) VALUES (?, ?)'
+
+def init_tables(db_path):
+    conn = sqlite3.connect(db_path, cached_statements=256)
+    # WAL does not apply to in-memory databases
+    if db_path != ':memory:':
+        conn.execute('PRAGMA journal_mode=WAL')
+    conn.executescript(CONNECTION_PRAGMAS)
+    conn.executescript(SCHEMA_DDL)
+    ensure_hand_columns(conn)
+    return conn
 
-def init_db(db_path):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+def create_indexes(conn):
+    conn.executescript(POST_LOAD_INDEXES)
+    conn.commit()
 
-    # Hands table
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS hands (
-        hand_id TEXT PRIMARY KEY,
-        dealer_name TEXT,
-        started_at TEXT
-    )
-    ''')
-
-    # Players table (New mapping for id -> name)
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS players (
-        player_id TEXT,
-        player_name TEXT,
-        PRIMARY KEY (player_id, player_name)
-    )
-    ''')
-
-    # Player hole cards table
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS player_hand_cards (
-        hand_id TEXT,
-        player_id TEXT,
-        hole_cards TEXT,
-        PRIMARY KEY (hand_id, player_id)
-    )
-    ''')
-
-    # Events table
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS events (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        hand_id TEXT,
-        player_id TEXT,
-        action TEXT,
-        amount REAL,
-        pot_size REAL,
-        stage TEXT,     -- 'Preflop', 'Flop', 'Turn', 'River', 'Showdown'
-        timestamp TEXT,
-        raw_entry TEXT,
-        FOREIGN KEY(hand_id) REFERENCES hands(hand_id)
-    )
-    ''')
-
-    # Player Priors table (New table for long-term opponent intelligence)
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS player_priors (
-        player_id TEXT PRIMARY KEY,
-        total_hands INTEGER,
-        vpip_pct REAL,
-        pfr_pct REAL,
-        three_bet_pct REAL,
-        wtsd_pct REAL,
-        wsd_pct REAL,
-        wwsf_pct REAL,
-        river_bluff_freq REAL,
-        avg_showdown_strength REAL,
-        profile_tag TEXT
-    )
-    ''')
+def bump_ingest_version(conn):
+    # Called inside a load's transaction, so the new rows and the new version commit together
+    conn.execute('INSERT INTO ingest_version (version) SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM ingest_version)')
+    conn.execute('UPDATE ingest_version SET version = version + 1')
 
-    # Processed Games table
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS processed_games (
-        game_id TEXT PRIMARY KEY,
-        processed_at TEXT
-    )
-    ''')
+def read_ingest_version(conn):
+    # Databases loaded before the counter existed read as version 0
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ingest_version'").fetchone()
+    if not exists:
+        return 0
+    return conn.execute('SELECT COALESCE(MAX(version), 0) FROM ingest_version').fetchone()[0]
 
-    conn.commit()
+def init_db(db_path):
+    conn = init_tables(db_path)
+    create_indexes(conn)
     return conn
 
-def parse_json(json_path, db_path):
-    conn = init_db(db_path)
+def load_hands(json_path):
+    # Returns (gameId, iterable of hands). With ijson the hands are streamed one at a time so
+    # memory stays flat however large the log is; otherwise the file is parsed in one go.
+    if ijson:
+        with open(json_path, 'rb') as f:
+            game_id = next(ijson.items(f, 'gameId'), None)
+
+        def stream():
+            with open(json_path, 'rb') as f:
+                yield from ijson.items(f, 'hands.item', use_float=True)
+        return game_id, stream()
+
+    with open(json_path, 'rb') as f:
+        raw = f.read()
+    # orjson is optional and parses several times faster; both accept UTF-8 bytes
+    data = orjson.loads(raw) if orjson else json.loads(raw)
+    return data.get('gameId'), data.get('hands', [])
+
+EVENT_BATCH_SIZE = 10000
+
+# Pot sign for events whose payload value is not recorded (their amount stays 0)
+NO_VALUE = None
+
+# payload type -> (action, pot sign, stage it moves the hand to). The recorded amount is
+# added to the running pot times the sign: 1 adds, -1 takes back, 0 leaves the pot alone
+EVENT_HANDLERS = {
+    3: ('post_sb', 1, None),
+    2: ('post_bb', 1, None),
+    4: ('post_other', 1, None),
+    5: ('post_other', 1, None),
+    6: ('post_other', 1, None),
+    14: ('post_other', 1, None),
+    11: ('fold', NO_VALUE, None),
+    0: ('check', NO_VALUE, None),
+    7: ('call', 1, None),
+    # Covers both bet and raise. Not perfectly accurate for pot size without full player state,
+    # but we just keep it simple as in the MVP
+    8: ('raise', 0, None),
+    # Uncalled bet returned
+    16: ('returned', -1, None),
+    10: ('collect', 0, 'Showdown'),
+    12: ('show', NO_VALUE, 'Showdown'),
+}
+OTHER_EVENT = ('other', NO_VALUE, None)
+COLLECT_EVENT = 10
+
+BOARD_EVENT = 9
+# payload turn -> stage. Deals are not stored as events; the last one is kept on the hand
+BOARD_DEALS = {1: 'Flop', 2: 'Turn', 3: 'River'}
+
+def parse_json_into(conn, json_path):
+    # Loads one log through an open connection (see init_tables); returns False if the game was already loaded
     cursor = conn.cursor()
 
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    game_id = data.get('gameId')
-    if game_id:
-        cursor.execute('SELECT game_id FROM processed_games WHERE game_id = ?', (game_id,))
-        if cursor.fetchone():
-            print(f"Game {game_id} already processed. Skipping file {json_path}.")
-            conn.close()
-            return False
+    # The whole file lands in one transaction: a failure part-way leaves the database untouched
+    try:
+        cursor.execute('BEGIN IMMEDIATE')
+        game_id, hands = load_hands(json_path)
+        if game_id:
+            cursor.execute(SELECT_PROCESSED_GAME_SQL, (game_id,))
+            if cursor.fetchone():
+                print(f"Game {game_id} already processed. Skipping file {json_path}.")
+                conn.rollback()
+                return False
+
+        # Rows are buffered and written with executemany; events flush every EVENT_BATCH_SIZE rows
+        players_buf = []
+        # The same (id, name) pairs repeat every hand; each is written once per file
+        seen_players = set()
+        cards_buf = []
+        hands_buf = []
+        events_buf = []
+
+        def flush():
+            cursor.executemany(INSERT_PLAYER_SQL, players_buf)
+            cursor.executemany(INSERT_HAND_CARDS_SQL, cards_buf)
+            cursor.executemany(INSERT_HAND_SQL, hands_buf)
+            cursor.executemany(INSERT_EVENT_SQL, events_buf)
+            for buf in (players_buf, cards_buf, hands_buf, events_buf):
+                buf.clear()
+
+        for hand in hands:
+            # 1. Standard Play Filter
+            if hand.get('gameType', 'th') != 'th':
+                continue
+            if hand.get('bombPot', False):
+                continue
+            if len(hand.get('players', [])) < 6:
+                continue
+            if hand.get('straddleSeat') is not None:
+                continue
+
+            # 'Walk' Hands: Any hand where the only pre-flop actions are 'Folds' or 'Checks' by the blinds.
+            is_walk_hand = True
+            for event in hand.get('events', []):
+                evt_type = event.get('payload', {}).get('type')
+                if evt_type == 9:  # Board dealt (flop reached)
+                    break
+                if evt_type in [7, 8]:  # 7 = Call, 8 = Raise
+                    is_walk_hand = False
+                    break
+
+            if is_walk_hand:
+                continue
+
+            hand_id = hand['id']
+            started_at = datetime.fromtimestamp(hand['startedAt'] / 1000).isoformat()
+            # Amounts are stored as integer cents; cents tables already log them that way
+            scale = 1 if hand.get('cents', False) else 100
+
+            # map seats to player IDs (a list indexed by seat number) and save name mappings
+            seat_to_id = [None] * 11
+            for p in hand.get('players', []):
+                pid = p['id']
+                pname = p['name']
+                seat = p['seat']
+                if seat >= len(seat_to_id):
+                    seat_to_id.extend([None] * (seat - len(seat_to_id) + 1))
+                seat_to_id[seat] = pid
+
+                # Insert into players table mapping
+                player = (pid, pname)
+                if player not in seen_players:
+                    seen_players.add(player)
+                    players_buf.append(player)
+
+                # Insert hole cards if available
+                cards = p.get('hand')
+                if cards:
+                    cards_str = ','.join(cards)
+                    cards_buf.append((hand_id, pid, cards_str))
+
+            dealer_seat = hand.get('dealerSeat')
+            # We don't have strictly player_name on the hands table anymore but we'll leave dealer_name as is for simplicity,
+            # or we could resolve it. Let's just resolve to ID if we have it, else leave Unknown.
+            # Actually dealer_name is TEXT. We can put the ID there. Let's just put the ID.
+            dealer_id = seat_to_id[dealer_seat] if dealer_seat is not None and 0 <= dealer_seat < len(seat_to_id) else None
+            if dealer_id is None:
+                dealer_id = "Unknown"
+
+            stage = "Preflop"
+            board_stage = None
+            pot_size = 0
+
+            for event in hand.get('events', []):
+                payload = event.get('payload', {})
+                # Bound once: every event reads several payload keys
+                pget = payload.get
+                evt_type = pget('type')
+                amount = 0
+
+                # Board cards dealt: only the stage moves on
+                if evt_type == BOARD_EVENT:
+                    deal_stage = BOARD_DEALS.get(pget('turn'))
+                    if deal_stage:
+                        stage = board_stage = deal_stage
+                    continue
+
+                # Map payload types to actions
+                seat = pget('seat')
+                player_id = seat_to_id[seat] if seat and 0 < seat < len(seat_to_id) else None
+                action, pot_sign, new_stage = EVENT_HANDLERS.get(evt_type, OTHER_EVENT)
+                # Seatless events are not stored but still move the pot and stage
+                if pot_sign is not NO_VALUE:
+                    # Collect events may only carry the pot
+                    value = pget('value', 0) if evt_type != COLLECT_EVENT else pget('value', pget('pot', 0))
+                    amount = round(value * scale)
+                    pot_size += pot_sign * amount
+                if new_stage:
+                    stage = new_stage
+                if not player_id:
+                    continue
 
-    for hand in data.get('hands', []):
-        # 1. Standard Play Filter
-        if hand.get('gameType', 'th') != 'th':
-            continue
-        if hand.get('bombPot', False):
-            continue
-        if len(hand.get('players', [])) < 6:
-            continue
-        if hand.get('straddleSeat') is not None:
-            continue
-
-        # 'Walk' Hands: Any hand where the only pre-flop actions are 'Folds' or 'Checks' by the blinds.
-        is_walk_hand = True
-        for event in hand.get('events', []):
-            evt_type = event.get('payload', {}).get('type')
-            if evt_type == 9:  # Board dealt (flop reached)
-                break
-            if evt_type in [7, 8]:  # 7 = Call, 8 = Raise
-                is_walk_hand = False
-                break
-
-        if is_walk_hand:
-            continue
-
-        hand_id = hand['id']
-        started_at = datetime.fromtimestamp(hand['startedAt'] / 1000).isoformat()
-        is_cents = hand.get('cents', False)
-
-        # map seats to player IDs and save name mappings
-        seat_to_id = {}
-        for p in hand.get('players', []):
-            pid = p['id']
-            pname = p['name']
-            seat_to_id[p['seat']] = pid
-
-            # Insert into players table mapping
-            cursor.execute('INSERT OR IGNORE INTO players (player_id, player_name) VALUES (?, ?)',
-                           (pid, pname))
-
-            # Insert hole cards if available
-            cards = p.get('hand')
-            if cards:
-                cards_str = ','.join(cards)
-                cursor.execute('INSERT OR IGNORE INTO player_hand_cards (hand_id, player_id, hole_cards) VALUES (?, ?, ?)',
-                               (hand_id, pid, cards_str))
-
-        dealer_seat = hand.get('dealerSeat')
-        # We don't have strictly player_name on the hands table anymore but we'll leave dealer_name as is for simplicity,
-        # or we could resolve it. Let's just resolve to ID if we have it, else leave Unknown.
-        # Actually dealer_name is TEXT. We can put the ID there. Let's just put the ID.
-        dealer_id = seat_to_id.get(dealer_seat, "Unknown")
-
-        cursor.execute('INSERT OR IGNORE INTO hands (hand_id, dealer_name, started_at) VALUES (?, ?, ?)',
-                       (hand_id, dealer_id, started_at))
-
-        stage = "Preflop"
-        pot_size = 0.0
-
-        for event in hand.get('events', []):
-            at = event['at']
-            timestamp = datetime.fromtimestamp(at / 1000).isoformat()
-            payload = event.get('payload', {})
-            evt_type = payload.get('type')
-
-            seat = payload.get('seat')
-            player_id = seat_to_id.get(seat) if seat else None
-
-            action = None
-            amount = 0.0
-
-            def get_val(val):
-                return float(val) / 100.0 if is_cents else float(val)
-
-            # Map payload types to actions
-            if evt_type == 3:
-                action = 'post_sb'
-                amount = get_val(payload.get('value', 0))
-                pot_size += amount
-            elif evt_type == 2:
-                action = 'post_bb'
-                amount = get_val(payload.get('value', 0))
-                pot_size += amount
-            elif evt_type in [4, 5, 6, 14]:
-                action = 'post_other'
-                amount = get_val(payload.get('value', 0))
-                pot_size += amount
-            elif evt_type == 11:
-                action = 'fold'
-            elif evt_type == 0:
-                action = 'check'
-            elif evt_type == 7:
-                action = 'call'
-                amount = get_val(payload.get('value', 0))
-                pot_size += amount
-            elif evt_type == 8:
-                action = 'raise' # Covers both bet and raise
-                amount = get_val(payload.get('value', 0))
-                # Not perfectly accurate for pot size without full player state,
-                # but we just keep it simple as in the MVP
-            elif evt_type == 16:
-                # Uncalled bet returned
-                action = 'returned'
-                amount = get_val(payload.get('value', 0))
-                pot_size -= amount
-            elif evt_type == 10:
-                action = 'collect'
-                amount = get_val(payload.get('value', payload.get('pot', 0)))
-                stage = "Showdown"
-            elif evt_type == 12:
-                action = 'show'
-                stage = "Showdown"
-            elif evt_type == 9:
-                # Board cards dealt
-                turn = payload.get('turn')
-                if turn == 1:
-                    stage = "Flop"
-                    action = 'deal_flop'
-                elif turn == 2:
-                    stage = "Turn"
-                    action = 'deal_turn'
-                elif turn == 3:
-                    stage = "River"
-                    action = 'deal_river'
-                player_id = 'Dealer'
-            else:
-                action = 'other'
-
-            if action and player_id:
                 # Store the raw JSON payload as string just in case
-                raw_entry = json.dumps(payload)
-                cursor.execute('''
-                INSERT INTO events (hand_id, player_id, action, amount, pot_size, stage, timestamp, raw_entry)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (hand_id, player_id, action, amount, pot_size, stage, timestamp, raw_entry))
+                raw_entry = orjson.dumps(payload).decode() if orjson else json.dumps(payload)
+                events_buf.append((hand_id, player_id, action, amount, pot_size, stage, event['at'], raw_entry))
 
-    if game_id:
-        cursor.execute('INSERT OR IGNORE INTO processed_games (game_id, processed_at) VALUES (?, ?)',
-                       (game_id, datetime.now().isoformat()))
+            hands_buf.append((hand_id, dealer_id, started_at, board_stage))
 
-    conn.commit()
-    conn.close()
+            if len(events_buf) >= EVENT_BATCH_SIZE:
+                flush()
+
+        flush()
+
+        if game_id:
+            cursor.execute(INSERT_PROCESSED_GAME_SQL, (game_id, datetime.now().isoformat()))
+
+        backfill_hand_combos(conn)
+        bump_ingest_version(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
     return True
 
-import shutil
-import glob
+def parse_json(json_path, db_path):
+    conn = init_tables(db_path)
+    try:
+        return parse_json_into(conn, json_path)
+    finally:
+        conn.close()
+
+# Copies one staging database (attached as "staging") into the main one, keeping row order
+MERGE_STAGING_STATEMENTS = [
+    '''INSERT OR IGNORE INTO players (player_id, player_name)
+    SELECT player_id, player_name FROM staging.players ORDER BY rowid''',
+    '''INSERT OR IGNORE INTO player_hand_cards (hand_id, player_id, hole_cards, hand_combo)
+    SELECT hand_id, player_id, hole_cards, hand_combo FROM staging.player_hand_cards ORDER BY rowid''',
+    '''INSERT OR IGNORE INTO hands (hand_id, dealer_name, started_at, units, board_stage)
+    SELECT hand_id, dealer_name, started_at, units, board_stage FROM staging.hands ORDER BY rowid''',
+    '''INSERT INTO events (hand_id, player_id, action, amount, pot_size, stage, timestamp, raw_entry)
+    SELECT hand_id, player_id, action, amount, pot_size, stage, timestamp, raw_entry FROM staging.events ORDER BY id''',
+    '''INSERT OR IGNORE INTO processed_games (game_id, processed_at)
+    SELECT game_id, processed_at FROM staging.processed_games''',
+]
+
+def _stage_file(job):
+    # Pool worker: parse one log into its own staging database, so workers never share a writer
+    json_file, staging_path = job
+    try:
+        parse_json(json_file, staging_path)
+        return json_file, staging_path, None
+    except Exception as e:
+        return json_file, staging_path, str(e)
+
+def merge_staging(conn, json_file, staging_path):
+    conn.execute('ATTACH DATABASE ? AS staging', (staging_path,))
+    try:
+        # Games can only be checked against the main database once parsed
+        seen = conn.execute('''
+        SELECT s.game_id FROM staging.processed_games s JOIN processed_games p ON s.game_id = p.game_id
+        ''').fetchone()
+        if seen:
+            print(f"Game {seen[0]} already processed. Skipping file {json_file}.")
+            return False
+        with conn:
+            for statement in MERGE_STAGING_STATEMENTS:
+                conn.execute(statement)
+            bump_ingest_version(conn)
+        return True
+    finally:
+        conn.execute('DETACH DATABASE staging')
 
 def process_directory(input_dir, db_path):
     # Ensure ingested directory exists
     ingested_dir = os.path.join(input_dir, '..', 'ingested')
     os.makedirs(ingested_dir, exist_ok=True)
 
-    # Process all JSON files in the directory
-    search_pattern = os.path.join(input_dir, '*.json')
-    files_to_process = glob.glob(search_pattern)
+    # Process all JSON files in the directory (hidden files skipped, as glob did)
+    with os.scandir(input_dir) as entries:
+        files_to_process = [e.path for e in entries
+                            if e.name.endswith('.json') and not e.name.startswith('.') and e.is_file()]
 
     if not files_to_process:
         print(f"No JSON files found in {input_dir}")
         return False
 
+    conn = init_tables(db_path)
+    backfill_hand_combos(conn)
+    conn.commit()
+
     processed_any = False
-    for json_file in files_to_process:
-        print(f"Processing {json_file}...")
-        try:
-            parse_json(json_file, db_path)
-
-            # Move the file on success
-            filename = os.path.basename(json_file)
-            dest_path = os.path.join(ingested_dir, filename)
-            shutil.move(json_file, dest_path)
-            print(f"Successfully processed and moved {filename} to {ingested_dir}")
-            processed_any = True
-        except Exception as e:
-            print(f"Error processing {json_file}: {e}")
+    with tempfile.TemporaryDirectory() as staging_dir:
+        jobs = [(json_file, os.path.join(staging_dir, f'{i}.db')) for i, json_file in enumerate(files_to_process)]
+
+        # Files are parsed in parallel and merged in their original order as they finish;
+        # a single file is parsed inline rather than starting a worker pool for it
+        with (Pool(min(os.cpu_count() or 1, len(jobs))) if len(jobs) > 1 else nullcontext()) as pool:
+            results = pool.imap(_stage_file, jobs) if pool else map(_stage_file, jobs)
+            for json_file, staging_path, error in results:
+                print(f"Processing {json_file}...")
+                try:
+                    if error:
+                        raise RuntimeError(error)
+                    merge_staging(conn, json_file, staging_path)
+
+                    # Move the file on success
+                    filename = os.path.basename(json_file)
+                    dest_path = os.path.join(ingested_dir, filename)
+                    os.replace(json_file, dest_path)
+                    print(f"Successfully processed and moved {filename} to {ingested_dir}")
+                    processed_any = True
+                except Exception as e:
+                    print(f"Error processing {json_file}: {e}")
+
+    if processed_any:
+        create_indexes(conn)
+    conn.close()
 
     return processed_any
 
@@ -285,7 +495,10 @@ if __name__ == "__main__":
     if os.path.isdir(args.input_path):
         process_directory(args.input_path, args.db)
     elif os.path.isfile(args.input_path):
-        parse_json(args.input_path, args.db)
+        conn = init_tables(args.db)
+        if parse_json_into(conn, args.input_path):
+            create_indexes(conn)
+        conn.close()
         print(f"Successfully processed {args.input_path} into {args.db}")
     else:
         print(f"Path not found: {args.input_path}")
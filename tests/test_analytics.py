@@ -7,7 +7,7 @@ import json
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from analytics import PokerAnalytics
-from ingest import init_db
+from ingest import init_db, bump_ingest_version
 
 class TestAnalytics(unittest.TestCase):
     def setUp(self):
@@ -20,6 +20,8 @@ class TestAnalytics(unittest.TestCase):
         # Hack to replace the conn with our in-memory one
         # Because PokerAnalytics internally creates a new connection, we'll patch it:
         self.analytics.conn = self.conn
+        # ...and run its open-time schema setup against the swapped-in connection
+        self.analytics._ensure_indexes()
 
         # Setup mock data
         self.cursor = self.conn.cursor()
@@ -246,6 +248,19 @@ class TestAnalytics(unittest.TestCase):
         self.assertEqual(bb_stats['total_hands'], 2)
         self.assertEqual(bb_stats['vpip_hands'], 0)
 
+    def test_get_player_profile(self):
+        profile = self.analytics.get_player_profile('p1')
+
+        self.assertEqual(profile['priors']['player_id'].tolist(), ['p1'])
+        pd.testing.assert_frame_equal(
+            profile['priors'].reset_index(drop=True),
+            self.analytics.get_priors().query("player_id == 'p1'").reset_index(drop=True)
+        )
+        self.assertEqual(profile['bet_sizing'].index.tolist(), ['p1'])
+        self.assertEqual(profile['bet_sizing'].loc['p1', 'Large (>66%)'], 1)
+        self.assertEqual(profile['pnl_by_position']['net_profit'].sum(), -14.5)
+        self.assertEqual(profile['hand_pnl']['hand_combo'].tolist(), self.analytics.get_pnl_by_hand('p1')['hand_combo'].tolist())
+
     def test_get_net_pnl_all_players(self):
         df = self.analytics.get_net_pnl_all_players()
         self.assertFalse(df.empty)
@@ -254,6 +269,35 @@ class TestAnalytics(unittest.TestCase):
         p1_net = df[df['player_id'] == 'p1'].iloc[0]['total_net_pnl']
         self.assertEqual(p1_net, -14.5)
 
+    def test_get_net_pnl_all_players_cents(self):
+        # Hands ingested in integer cents are converted back to dollars
+        self.cursor.execute("UPDATE hands SET units = 'cents'")
+        self.cursor.execute('UPDATE events SET amount = CAST(amount * 100 AS INTEGER), pot_size = CAST(pot_size * 100 AS INTEGER)')
+        self.conn.commit()
+
+        df = self.analytics.get_net_pnl_all_players()
+        p1_net = df[df['player_id'] == 'p1'].iloc[0]['total_net_pnl']
+        self.assertEqual(p1_net, -14.5)
+
+    def test_hand_facts_refresh_after_ingest(self):
+        self.assertEqual(self.analytics.get_net_pnl_all_players().set_index('player_id').loc['p1', 'total_net_pnl'], -14.5)
+        # p1 collects 1 more in h4, written the way a load writes: rows and version bump together
+        self.cursor.execute("UPDATE events SET amount = 10.0 WHERE hand_id = 'h4' AND action = 'collect'")
+        bump_ingest_version(self.conn)
+        self.conn.commit()
+        self.assertEqual(self.analytics.get_net_pnl_all_players().set_index('player_id').loc['p1', 'total_net_pnl'], -13.5)
+
+    def test_display_names_refresh_after_ingest(self):
+        self.analytics.get_priors()
+        self.cursor.execute("INSERT INTO players (player_id, player_name) VALUES ('p4', 'Dana')")
+        self.cursor.execute("INSERT INTO events (hand_id, player_id, action, amount, pot_size, stage) VALUES ('h4', 'p4', 'fold', 0, 9.0, 'River')")
+        bump_ingest_version(self.conn)
+        self.conn.commit()
+
+        pnl = self.analytics.get_net_pnl_all_players().set_index('player_id')
+        self.assertEqual(pnl.loc['p4', 'display_name'], 'Dana')
+        self.assertEqual(self.analytics.get_priors().set_index('player_id').loc['p4', 'display_name'], 'Dana')
+
     def test_calculate_and_store_player_priors(self):
         # We run the calculation method, it should populate the `player_priors` table
         self.analytics.calculate_and_store_player_priors()
@@ -289,6 +333,30 @@ class TestAnalytics(unittest.TestCase):
         # River bluff opportunities: h4. (River raise/bet and won without showdown) -> 1 bluff!
         self.assertEqual(p3['river_bluff_freq'], 100.0)
 
+    def test_calculate_and_store_player_priors_board_stage(self):
+        # Newer ingests keep the board on the hand instead of 'Dealer' events
+        self.cursor.execute("UPDATE hands SET board_stage = 'River' WHERE hand_id IN ('h3', 'h4')")
+        self.cursor.execute("DELETE FROM events WHERE player_id = 'Dealer'")
+        self.conn.commit()
+        self.analytics.calculate_and_store_player_priors()
+
+        df = pd.read_sql_query("SELECT * FROM player_priors", self.conn).set_index('player_id')
+        self.assertEqual(sorted(df.index), ['p1', 'p2', 'p3'])
+        self.assertEqual(df.loc['p1', 'wtsd_pct'], 100.0)
+        self.assertEqual(df.loc['p2', 'wwsf_pct'], 50.0)
+        self.assertEqual(df.loc['p3', 'river_bluff_freq'], 100.0)
+
+    def test_hand_sets_refresh_after_ingest(self):
+        self.analytics.calculate_and_store_player_priors()
+        # A flop recorded only on the hand: p1 never folded h1 preflop, so h1 joins p1's seen flops
+        self.cursor.execute("UPDATE hands SET board_stage = 'Flop' WHERE hand_id = 'h1'")
+        bump_ingest_version(self.conn)
+        self.conn.commit()
+        self.analytics.calculate_and_store_player_priors()
+
+        p1 = pd.read_sql_query("SELECT * FROM player_priors WHERE player_id = 'p1'", self.conn).iloc[0]
+        self.assertEqual(p1['wtsd_pct'], 66.67)
+
     def test_get_exploit_targets(self):
         self.analytics.calculate_and_store_player_priors()
 
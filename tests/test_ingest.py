@@ -2,11 +2,13 @@ import unittest
 import sqlite3
 import os
 import sys
+import json
+import tempfile
 
 # Add parent directory to sys.path so we can import ingest
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from ingest import init_db
+from ingest import init_db, init_tables, backfill_hand_combos, parse_json, parse_json_into, process_directory
 
 class TestIngest(unittest.TestCase):
     def setUp(self):
@@ -54,5 +56,142 @@ class TestIngest(unittest.TestCase):
         event_count = self.cursor.fetchone()[0]
         self.assertEqual(event_count, 1)
 
+    def test_backfill_hand_combos(self):
+        cards = [('h1', 'As,Ks'), ('h2', 'Jd,Th'), ('h3', '9c,Qh'), ('h4', 'Qs,Qd'), ('h5', 'As'), ('h6', 'Xs,Ks')]
+        self.cursor.executemany("INSERT INTO player_hand_cards (hand_id, player_id, hole_cards) VALUES (?, 'p1', ?)", cards)
+        backfill_hand_combos(self.conn)
+
+        self.cursor.execute('SELECT hand_id, hand_combo FROM player_hand_cards ORDER BY hand_id')
+        self.assertEqual(self.cursor.fetchall(), [
+            ('h1', 'AKs'), ('h2', 'JTo'), ('h3', 'Q9o'), ('h4', 'QQ'), ('h5', 'Unknown'), ('h6', 'Xs,Ks')
+        ])
+
+    def test_backfill_hand_combos_adds_missing_column(self):
+        conn = sqlite3.connect(':memory:')
+        conn.execute('CREATE TABLE player_hand_cards (hand_id TEXT, player_id TEXT, hole_cards TEXT, PRIMARY KEY (hand_id, player_id))')
+        conn.execute("INSERT INTO player_hand_cards VALUES ('h1', 'p1', '2c,2d')")
+        backfill_hand_combos(conn)
+        self.assertEqual(conn.execute('SELECT hand_combo FROM player_hand_cards').fetchone()[0], '22')
+        conn.close()
+
+    def _sample_hand(self, hand_id):
+        players = [{'id': f'p{i}', 'name': f'Player {i}', 'seat': i} for i in range(1, 7)]
+        players[0]['hand'] = ['Ah', 'Kh']
+        events = [
+            {'at': 1700000001000, 'payload': {'type': 3, 'seat': 1, 'value': 50}},
+            {'at': 1700000002000, 'payload': {'type': 2, 'seat': 2, 'value': 100}},
+            {'at': 1700000003000, 'payload': {'type': 8, 'seat': 3, 'value': 300}},
+            {'at': 1700000004000, 'payload': {'type': 11, 'seat': 4}},
+            {'at': 1700000005000, 'payload': {'type': 7, 'seat': 1, 'value': 300}},
+            {'at': 1700000006000, 'payload': {'type': 9, 'turn': 1}},
+            {'at': 1700000007000, 'payload': {'type': 10, 'seat': 3, 'value': 650}},
+        ]
+        return {'id': hand_id, 'startedAt': 1700000000000, 'dealerSeat': 6, 'cents': True, 'players': players, 'events': events}
+
+    def _write_log(self, tmp, log, name='log.json'):
+        path = os.path.join(tmp, name)
+        with open(path, 'w') as f:
+            json.dump(log, f)
+        return path
+
+    def test_parse_json(self):
+        hand = self._sample_hand('h1')
+        log = {'gameId': 'g1', 'hands': [
+            hand,
+            # Fewer than six players: filtered out
+            dict(hand, id='h2', players=hand['players'][:5]),
+        ]}
+
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path = self._write_log(tmp, log)
+            db_path = os.path.join(tmp, 'test.db')
+
+            self.assertTrue(parse_json(json_path, db_path))
+            self.assertFalse(parse_json(json_path, db_path))
+
+            conn = sqlite3.connect(db_path)
+            self.assertEqual(conn.execute('SELECT hand_id, dealer_name, units, board_stage FROM hands').fetchall(), [('h1', 'p6', 'cents', 'Flop')])
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM players').fetchone()[0], 6)
+            self.assertEqual(conn.execute('SELECT hand_combo FROM player_hand_cards').fetchall(), [('AKs',)])
+            self.assertEqual(conn.execute('SELECT player_id, action, amount, pot_size, stage FROM events ORDER BY id').fetchall(), [
+                ('p1', 'post_sb', 50, 50, 'Preflop'),
+                ('p2', 'post_bb', 100, 150, 'Preflop'),
+                ('p3', 'raise', 300, 150, 'Preflop'),
+                ('p4', 'fold', 0, 150, 'Preflop'),
+                ('p1', 'call', 300, 450, 'Preflop'),
+                ('p3', 'collect', 650, 450, 'Showdown'),
+            ])
+            self.assertEqual(conn.execute('SELECT MIN(timestamp), MAX(timestamp) FROM events').fetchone(), (1700000001000, 1700000007000))
+            self.assertEqual(conn.execute('SELECT game_id FROM processed_games').fetchall(), [('g1',)])
+            # Bumped by the load, not by the skipped duplicate
+            self.assertEqual(conn.execute('SELECT version FROM ingest_version').fetchall(), [(1,)])
+            conn.close()
+
+    def test_parse_json_into_shared_connection(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, 'test.db')
+            paths = [self._write_log(tmp, {'gameId': f'g{i}', 'hands': [self._sample_hand(f'h{i}')]}, f'log{i}.json') for i in range(2)]
+
+            conn = init_tables(db_path)
+            self.assertTrue(parse_json_into(conn, paths[0]))
+            self.assertFalse(parse_json_into(conn, paths[0]))
+            self.assertTrue(parse_json_into(conn, paths[1]))
+            self.assertFalse(conn.in_transaction)
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM hands').fetchone()[0], 2)
+            conn.close()
+
+    def test_parse_json_dollar_amounts_stored_as_cents(self):
+        hand = self._sample_hand('h1')
+        hand['cents'] = False
+        for event in hand['events']:
+            if 'value' in event['payload']:
+                event['payload']['value'] /= 100
+
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path = self._write_log(tmp, {'gameId': 'g1', 'hands': [hand]})
+            db_path = os.path.join(tmp, 'test.db')
+
+            self.assertTrue(parse_json(json_path, db_path))
+            conn = sqlite3.connect(db_path)
+            self.assertEqual(conn.execute("SELECT amount, pot_size FROM events WHERE action = 'call'").fetchone(), (300, 450))
+            conn.close()
+
+    def test_parse_json_rolls_back_on_error(self):
+        bad_hand = self._sample_hand('h2')
+        del bad_hand['startedAt']
+        log = {'gameId': 'g1', 'hands': [self._sample_hand('h1'), bad_hand]}
+
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path = self._write_log(tmp, log)
+            db_path = os.path.join(tmp, 'test.db')
+
+            with self.assertRaises(KeyError):
+                parse_json(json_path, db_path)
+
+            conn = sqlite3.connect(db_path)
+            for table in ('hands', 'players', 'events', 'processed_games'):
+                self.assertEqual(conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0], 0)
+            conn.close()
+
+    def test_process_directory(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            input_dir = os.path.join(tmp, 'to_be_ingested')
+            os.makedirs(input_dir)
+            db_path = os.path.join(tmp, 'test.db')
+            self._write_log(input_dir, {'gameId': 'g1', 'hands': [self._sample_hand('h1')]})
+
+            self.assertTrue(process_directory(input_dir, db_path))
+            self.assertTrue(os.path.exists(os.path.join(tmp, 'ingested', 'log.json')))
+
+            conn = sqlite3.connect(db_path)
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM events').fetchone()[0], 6)
+            # Secondary indexes are added once the load has finished
+            index = conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name = 'idx_events_hand_id_id'").fetchone()
+            self.assertIsNotNone(index)
+            stats = conn.execute("SELECT stat FROM sqlite_stat1 WHERE idx = 'idx_events_hand_id_id'").fetchone()
+            self.assertEqual(stats[0].split()[0], '6')
+            self.assertEqual(conn.execute('SELECT version FROM ingest_version').fetchall(), [(1,)])
+            conn.close()
+
 if __name__ == '__main__':
     unittest.main()